@@ -0,0 +1,302 @@
+"""Offline throughput benchmark for the shorts pipeline on synthetic media
+
+Generates test-pattern videos with a tone track at each requested duration
+and resolution, plus a fake transcript, then measures:
+
+    frames       sampled frames scored per second
+    audio        seconds of audio analyzed per second
+    transcript   transcript windows scored per second
+    boundaries   clip boundary selection time
+    render       encoded frames per second for one clip (all platforms)
+    pipeline     full process_video wall time and peak RSS
+
+Download and transcript fetching are replaced by a LocalFileSource and the
+fake transcript, so no network is used. Every stage runs once on a tiny
+clip before anything is measured, so library imports, JIT compilation and
+model loading are not charged to the first case. Stages whose dependencies
+are not installed are recorded with their error instead of a rate, and
+stages with no input (e.g. render when no clip was selected) as skipped. Results are
+written as JSON together with the git commit, so runs can be compared:
+
+    python benchmarks/pipeline.py --durations 30,120 --resolutions 640x360,1280x720
+    python benchmarks/pipeline.py --compare before.json after.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from shorts_generator import Instrumentation, JobWorkspace, LocalFileSource, VideoAnalyzer  # noqa: E402
+from shorts_generator.runtime import available_cpu_count, ffmpeg_binary  # noqa: E402
+
+WORDS = ("amazing incredible terrible wonderful shocking funny sad happy angry surprising "
+         "moment story people video today really never always everyone thing").split()
+
+# Stage -> summary key of the rate reported for it (numerator per second)
+RATE_LABELS = {
+    'frames': 'frames_per_second',
+    'audio': 'audio_seconds_per_second',
+    'transcript_scoring': 'windows_per_second',
+    'render': 'render_fps',
+}
+
+def make_synthetic_video(path, duration, width, height, fps=30):
+    """Encode a testsrc2 pattern with a sine tone, reusing an existing file"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.partial.mp4"
+    cmd = [
+        ffmpeg_binary(), '-nostdin', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:beep_factor=4:duration={duration}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest',
+        temp_path
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    os.replace(temp_path, path)
+    return path
+
+def make_fake_transcript(duration, entry_seconds=3.0, seed=0):
+    """Transcript entries shaped like YouTubeTranscriptApi output covering duration seconds"""
+    rng = random.Random(seed)
+    entries = []
+    start = 0.0
+    while start + entry_seconds <= duration:
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+        entries.append({'text': text, 'start': start, 'duration': entry_seconds})
+        start += entry_seconds
+    return entries
+
+class OfflineAnalyzer(VideoAnalyzer):
+    """VideoAnalyzer whose transcript comes from memory instead of YouTube"""
+
+    def __init__(self, transcript, **kwargs):
+        super().__init__(**kwargs)
+        self.fake_transcript = transcript
+
+    def extract_transcript(self, youtube_url):
+        return self.fake_transcript
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def warm_up(media_dir, work_dir, render_backend='ffmpeg'):
+    """Run the analysis stages once on a tiny clip and return the seconds it took"""
+    start = time.perf_counter()
+    video_path = make_synthetic_video(os.path.join(media_dir, 'warmup_2s_160x90.mp4'), 2, 160, 90)
+    transcript = make_fake_transcript(18)
+    analyzer = OfflineAnalyzer(transcript)
+    stages = [
+        lambda: analyzer.analyze_video_frames(video_path, frames_dir=os.path.join(work_dir, 'warmup_frames')),
+        lambda: analyzer.extract_audio_features(video_path, features=('peak_times',)),
+        lambda: analyzer.analyze_transcript_segments(transcript),
+    ]
+    if render_backend == 'moviepy':
+        stages.append(lambda: importlib.import_module('moviepy.editor'))
+    for stage in stages:
+        try:
+            stage()
+        except Exception:
+            pass  # The measured run records the error
+    return time.perf_counter() - start
+
+def measure(instrumentation, stage, function, **fields):
+    """Run function as an instrumented stage; return (result, record) and keep going on errors"""
+    records = []
+    instrumentation.hooks.append(records.append)
+    try:
+        with instrumentation.stage(stage, **fields) as record:
+            result = function(record)
+    except Exception:
+        result = None
+    finally:
+        instrumentation.hooks.remove(records.append)
+    return result, records[0]
+
+def summarize(record, numerator=None):
+    """Reduce a stage record to the numbers worth comparing across commits"""
+    summary = {'seconds': record['seconds'], 'peak_rss_mb': record['peak_rss_bytes'] / 2**20,
+               'items': record['items']}
+    if 'error' in record:
+        summary['error'] = record['error']
+    elif record['stage'] in RATE_LABELS and record['seconds'] > 0:
+        summary[RATE_LABELS[record['stage']]] = (numerator if numerator is not None else record['items'] or 0) \
+            / record['seconds']
+    return summary
+
+def bench_stages(video_path, duration, transcript, workdir, render_backend='ffmpeg', render=True):
+    """Measure each stage on its own and return {stage: summary}"""
+    instrumentation = Instrumentation()
+    analyzer = OfflineAnalyzer(transcript, instrumentation=instrumentation)
+    results = {}
+
+    frames, record = measure(instrumentation, 'frames', lambda r: _count(r, analyzer.analyze_video_frames(
+        video_path, frames_dir=os.path.join(workdir, 'frames'))[0]))
+    results['frames'] = summarize(record)
+
+    audio, record = measure(instrumentation, 'audio', lambda r: _count(r, analyzer.extract_audio_features(
+        video_path, features=('peak_times',)), len_of=lambda features: len(features['y'])))
+    results['audio'] = summarize(record, numerator=duration if audio is not None else None)
+
+    segments, record = measure(instrumentation, 'transcript_scoring',
+                               lambda r: _count(r, analyzer.analyze_transcript_segments(transcript)))
+    results['transcript_scoring'] = summarize(record)
+
+    clips = None
+    if frames is not None and audio is not None:
+        clips, record = measure(instrumentation, 'boundaries', lambda r: _count(r, analyzer.identify_clip_boundaries(
+            segments or [], audio, frames)))
+        results['boundaries'] = summarize(record)
+    else:
+        results['boundaries'] = {'skipped': 'frame or audio analysis failed'}
+
+    if render and clips:
+        clip_data = clips[0]
+        fps = 30
+        start_time = max(0, clip_data['start'])
+        encoded = sum(int(min(clip_data['end'] - start_time, specs['max_length']) * fps)
+                      for specs in analyzer.platform_specs.values())
+        output_paths = {platform_name: os.path.join(workdir, f"render_{platform_name}.mp4")
+                        for platform_name in analyzer.platform_specs}
+        outputs, record = measure(instrumentation, 'render', lambda r: _count(r, analyzer.render_clip(
+            video_path, clip_data, output_paths, render_backend=render_backend),
+            len_of=lambda paths: sum(1 for path in paths.values() if path)))
+        if outputs is not None and not any(outputs.values()):
+            record['error'] = 'no platform variant was rendered'
+        results['render'] = summarize(record, numerator=encoded)
+    elif render:
+        results['render'] = {'skipped': 'no clips'}
+
+    return results
+
+def _count(record, result, len_of=len):
+    record['items'] = len_of(result)
+    return result
+
+def bench_pipeline(video_path, transcript, workdir, num_clips=2, render_backend='ffmpeg'):
+    """Run process_video end to end offline and return wall time, peak RSS and per-stage seconds"""
+    records = []
+    analyzer = OfflineAnalyzer(transcript, instrumentation=Instrumentation([records.append]))
+    workspace = JobWorkspace(root=workdir, job_id='pipeline', cleanup='always')
+
+    start = time.perf_counter()
+    error = None
+    try:
+        clips = analyzer.process_video('synthetic://video', num_clips, render_backend=render_backend,
+                                       source=LocalFileSource(video_path, proxy_dir=workspace.scratch_dir),
+                                       use_feature_store=False, workspace=workspace)
+    except Exception as e:
+        clips, error = None, f"{type(e).__name__}: {e}"
+    result = {
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': max((record['peak_rss_bytes'] for record in records), default=0) / 2**20,
+        'clips': len(clips or []),
+        'stage_seconds': {},
+    }
+    for record in records:
+        result['stage_seconds'][record['stage']] = result['stage_seconds'].get(record['stage'], 0) + record['seconds']
+    if error:
+        result['error'] = error
+    return result
+
+def run_suite(durations, resolutions, media_dir, work_dir, render_backend='ffmpeg', render=True, pipeline=True):
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpu_count': available_cpu_count(),
+        'cases': [],
+    }
+    print("Warming up...")
+    results['warmup_seconds'] = warm_up(media_dir, work_dir, render_backend)
+
+    for duration in durations:
+        transcript = make_fake_transcript(duration)
+        for width, height in resolutions:
+            name = f"{duration}s_{width}x{height}"
+            print(f"Benchmarking {name}...")
+            video_path = make_synthetic_video(os.path.join(media_dir, f"{name}.mp4"), duration, width, height)
+            case_dir = os.path.join(work_dir, name)
+            os.makedirs(case_dir, exist_ok=True)
+
+            case = {'name': name, 'duration': duration, 'width': width, 'height': height,
+                    'transcript_entries': len(transcript),
+                    'stages': bench_stages(video_path, duration, transcript, case_dir, render_backend, render)}
+            if pipeline:
+                case['pipeline'] = bench_pipeline(video_path, transcript, case_dir, render_backend=render_backend)
+            results['cases'].append(case)
+
+            for stage, summary in case['stages'].items():
+                if 'skipped' in summary:
+                    print(f"  {stage:20s} skipped: {summary['skipped']}")
+                    continue
+                rate = next((f"{summary[label]:.1f} {label}" for label in RATE_LABELS.values() if label in summary),
+                            summary.get('error', ''))
+                print(f"  {stage:20s} {summary['seconds']:7.2f}s {summary['peak_rss_mb']:8.1f} MB  {rate}")
+    return results
+
+def compare(before_path, after_path):
+    """Print the ratio after/before of every rate and duration shared by two result files"""
+    with open(before_path) as f:
+        before = {case['name']: case for case in json.load(f)['cases']}
+    with open(after_path) as f:
+        after = json.load(f)
+
+    for case in after['cases']:
+        old = before.get(case['name'])
+        if not old:
+            continue
+        print(case['name'])
+        for stage, summary in case['stages'].items():
+            old_summary = old['stages'].get(stage, {})
+            for key, value in summary.items():
+                if key in RATE_LABELS.values() or key in ('seconds', 'peak_rss_mb'):
+                    if isinstance(old_summary.get(key), (int, float)) and old_summary[key]:
+                        print(f"  {stage:20s} {key:26s} {old_summary[key]:10.2f} -> {value:10.2f} "
+                              f"({value / old_summary[key]:.2f}x)")
+        if 'pipeline' in case and 'pipeline' in old and old['pipeline']['seconds']:
+            print(f"  {'pipeline':20s} {'seconds':26s} {old['pipeline']['seconds']:10.2f} -> "
+                  f"{case['pipeline']['seconds']:10.2f} ({case['pipeline']['seconds'] / old['pipeline']['seconds']:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', default='30,120', help='comma-separated video lengths in seconds')
+    parser.add_argument('--resolutions', default='640x360,1280x720', help='comma-separated WIDTHxHEIGHT')
+    parser.add_argument('--media-dir', default=os.path.join('benchmarks', 'media'))
+    parser.add_argument('--work-dir', default=os.path.join('benchmarks', 'work'))
+    parser.add_argument('--render-backend', default='ffmpeg', choices=('ffmpeg', 'moviepy'))
+    parser.add_argument('--skip-render', action='store_true')
+    parser.add_argument('--skip-pipeline', action='store_true')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'work', 'benchmark_results.json'))
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    durations = [int(value) for value in args.durations.split(',')]
+    resolutions = [tuple(int(side) for side in value.split('x')) for value in args.resolutions.split(',')]
+    results = run_suite(durations, resolutions, args.media_dir, args.work_dir, args.render_backend,
+                        render=not args.skip_render, pipeline=not args.skip_pipeline)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Import-time and memory cost of the analyzer, before and after the lazy package split
+
+Each scenario runs in a fresh interpreter and reports wall time and RSS
+growth for its imports:
+
+    before           the imports model.py ran at module import (plus its NLTK downloads)
+    package          import shorts_generator
+    analyzer         from shorts_generator import VideoAnalyzer; VideoAnalyzer()
+
+Modules that are not installed are skipped and listed, so the 'before'
+number is a lower bound on hosts without the full Colab stack.
+
+    python benchmarks/startup.py [--repeat 3] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module-level imports of the monolithic model.py
+EAGER_IMPORTS = [
+    'cv2', 'numpy', 'torch', 'torch.nn.functional', 'transformers', 'youtube_transcript_api',
+    'moviepy.editor', 'moviepy.video.tools.subtitles', 'moviepy.video.io.ffmpeg_writer', 'PIL.Image',
+    'pytube', 'matplotlib.pyplot', 'sklearn.cluster', 'pandas', 'requests', 'nltk', 'nltk.sentiment',
+    'librosa',
+]
+
+SCENARIOS = {
+    'before': f'''
+missing = []
+for name in {EAGER_IMPORTS!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+if 'nltk' not in missing:
+    import nltk
+    nltk.download('punkt', quiet=True)
+    nltk.download('vader_lexicon', quiet=True)
+''',
+    'package': '''
+missing = []
+import shorts_generator
+''',
+    'analyzer': '''
+missing = []
+from shorts_generator import VideoAnalyzer
+VideoAnalyzer()
+''',
+}
+
+HARNESS = '''
+import importlib, json, os, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({workdir!r})
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+rss_start = rss()
+start = time.perf_counter()
+{body}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'rss_bytes': rss() - rss_start,
+                  'missing': missing}}))
+'''
+
+def run_scenario(name, workdir):
+    code = HARNESS.format(root=REPO_ROOT, workdir=workdir, body=SCENARIOS[name])
+    process = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if process.returncode != 0:
+        return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'failed'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def benchmark_startup(repeat=3, workdir=None):
+    """Run every scenario repeat times and return the median seconds and RSS of each"""
+    workdir = workdir or REPO_ROOT
+    results = {}
+    for name in SCENARIOS:
+        runs = [run_scenario(name, workdir) for _ in range(repeat)]
+        errors = [run['error'] for run in runs if 'error' in run]
+        if errors:
+            results[name] = {'error': errors[0]}
+            continue
+        results[name] = {
+            'seconds': statistics.median(run['seconds'] for run in runs),
+            'rss_mb': statistics.median(run['rss_bytes'] for run in runs) / 2**20,
+            'missing': runs[0]['missing'],
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = benchmark_startup(args.repeat)
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:10s} error: {result['error']}")
+            continue
+        skipped = f" (skipped, not installed: {', '.join(result['missing'])})" if result['missing'] else ''
+        print(f"{name:10s} {result['seconds'] * 1000:8.0f} ms {result['rss_mb']:8.1f} MB{skipped}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
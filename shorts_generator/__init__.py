@@ -0,0 +1,67 @@
+"""YouTube shorts generator: finds the most engaging moments of a video and renders platform clips
+
+Importing the package is cheap. Submodules are imported when one of their
+names is first used, and the heavy libraries (torch, transformers, moviepy,
+librosa, OpenCV, matplotlib) only when a stage that needs them runs.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'VideoAnalyzer': 'analyzer',
+    'AudioFeatures': 'audio',
+    'AUDIO_FEATURES': 'audio',
+    'audio_feature': 'audio',
+    'decode_audio': 'audio',
+    'decode_audio_command': 'audio',
+    'DownloadCache': 'cache',
+    'FeatureStore': 'cache',
+    'OverlayCache': 'cache',
+    'OVERLAY_CACHE': 'cache',
+    'ANALYZER_VERSION': 'cache',
+    'ShortsDashboard': 'dashboard',
+    'run_shorts_generator': 'dashboard',
+    'FrameRangeIndex': 'frames',
+    'FrameStore': 'frames',
+    'IntervalSet': 'frames',
+    'iter_sampled_frames': 'frames',
+    'sampled_frame_indices': 'frames',
+    'visual_interest_score': 'frames',
+    'Instrumentation': 'instrumentation',
+    'JsonLinesSink': 'instrumentation',
+    'RssSampler': 'instrumentation',
+    'MODEL_REGISTRY': 'models',
+    'ModelRegistry': 'models',
+    'prewarm_models': 'models',
+    'FFmpegShortsRenderer': 'render',
+    'RenderScheduler': 'render',
+    'benchmark_render_backends': 'render',
+    'available_cpu_count': 'runtime',
+    'current_rss_bytes': 'runtime',
+    'ensure_nltk_resources': 'runtime',
+    'ffmpeg_binary': 'runtime',
+    'keyframe_at_or_before': 'runtime',
+    'FULL_FORMAT': 'sources',
+    'PROXY_FORMAT': 'sources',
+    'LocalFileSource': 'sources',
+    'YouTubeSource': 'sources',
+    'StageGraph': 'stages',
+    'RangeMaxTracker': 'streaming',
+    'StreamingPeakPicker': 'streaming',
+    'StreamingRms': 'streaming',
+    'TopK': 'streaming',
+    'iter_audio_blocks': 'streaming',
+    'JobWorkspace': 'workspace',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,1157 @@
+"""The VideoAnalyzer pipeline: download, analysis, clip selection and rendering"""
+import asyncio
+import bisect
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from .audio import PEAK_PICK_PARAMS, AudioFeatures, decode_audio
+from .cache import OVERLAY_CACHE, DownloadCache, FeatureStore
+from .frames import (FrameRangeIndex, FrameStore, IntervalSet, analyze_frame_range, _analyze_frame_range_job,
+                     _init_frame_worker)
+from .instrumentation import Instrumentation
+from .lazy import lazy_import
+from .models import MODEL_REGISTRY
+from .render import FFmpegShortsRenderer, RenderScheduler
+from .runtime import available_cpu_count, process_pool_context
+from .sources import FULL_FORMAT, PROXY_FORMAT, YouTubeSource
+from .stages import StageGraph
+from .streaming import RangeMaxTracker, StreamingPeakPicker, StreamingRms, TopK, iter_audio_blocks
+from .workspace import JobWorkspace
+
+cv2 = lazy_import('cv2')
+librosa = lazy_import('librosa')
+mp = lazy_import('moviepy.editor')
+torch = lazy_import('torch')
+
+class VideoAnalyzer:
+    def __init__(self, model_registry=None, overlay_cache=None, download_cache=None, feature_store=None,
+                 instrumentation=None):
+        # Per-stage timing, memory and item-count records go to the instrumentation hooks
+        self.instrumentation = instrumentation or Instrumentation()
+
+        # Models are loaded lazily through the shared registry
+        self.model_registry = model_registry or MODEL_REGISTRY
+
+        # Text overlays are rasterized once and reused across clips and platforms
+        self.overlay_cache = overlay_cache or OVERLAY_CACHE
+
+        # Downloaded source videos are reused across runs
+        self.download_cache = download_cache or DownloadCache()
+
+        # Set up audio model
+        self.sample_rate = 22050
+
+        # Number of transcript windows scored per emotion model forward pass
+        self.text_batch_size = 32
+
+        # Number of top transcript segments considered as clip candidates
+        self.max_candidate_segments = 20
+
+        # Weights of sentiment intensity and emotion confidence in a segment's interesting_score
+        self.transcript_score_weights = {'sentiment': 0.7, 'emotion': 0.3}
+
+        # Analysis features are persisted per video so re-runs skip straight to clip selection
+        self.feature_store = feature_store or FeatureStore()
+
+        # Initialize platform requirements dictionary
+        self.platform_specs = {
+            'youtube_shorts': {'max_length': 60, 'aspect_ratio': '9:16', 'caption_style': 'large_centered'},
+            'instagram_reels': {'max_length': 90, 'aspect_ratio': '9:16', 'caption_style': 'subtitle'},
+            'tiktok': {'max_length': 60, 'aspect_ratio': '9:16', 'caption_style': 'dynamic'}
+        }
+
+    @property
+    def sentiment_analyzer(self):
+        return self.model_registry.get('sentiment')
+
+    @property
+    def emotion_classifier(self):
+        return self.model_registry.get('emotion')
+
+    @property
+    def text_tokenizer(self):
+        return self.model_registry.get('text_embedding')[0]
+
+    @property
+    def text_model(self):
+        return self.model_registry.get('text_embedding')[1]
+
+    def extract_video_id(self, youtube_url):
+        """Extract video ID from YouTube URL"""
+        parsed_url = urlparse(youtube_url)
+
+        if 'youtube.com' in parsed_url.netloc:
+            if 'v' in parse_qs(parsed_url.query):
+                return parse_qs(parsed_url.query)['v'][0]
+        elif 'youtu.be' in parsed_url.netloc:
+            return parsed_url.path[1:]
+
+        return None
+
+    def download_youtube_video(self, url, output_path=None, format_selector=FULL_FORMAT):
+        """Download YouTube video using yt-dlp (more reliable than PyTube)
+
+        Downloads go through the download cache, so a video already fetched
+        with the same format selector is returned without touching the
+        network. If output_path is given the cached file is also copied there.
+        """
+        video_id = self.extract_video_id(url)
+        if not video_id:
+            print("Could not extract video ID from URL")
+            return None, None
+
+        key = self.download_cache.key(video_id, format_selector)
+        with self.download_cache.lock(key):
+            cached = self.download_cache.lookup(video_id, format_selector)
+            if cached:
+                print(f"Using cached video ID: {video_id}")
+                video_path, metadata = cached
+            else:
+                os.makedirs(self.download_cache.cache_dir, exist_ok=True)
+                staging_dir = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.download_cache.cache_dir)
+                try:
+                    video_path, metadata = self._download_to_cache(video_id, format_selector, staging_dir)
+                finally:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                if not video_path:
+                    return None, None
+
+        if output_path:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            shutil.copyfile(video_path, output_path)
+            video_path = output_path
+
+        return video_path, metadata.get('title') or "Video"
+
+    def _download_to_cache(self, video_id, format_selector, staging_dir):
+        """Download a video into staging_dir and move it into the cache"""
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        template = os.path.join(staging_dir, 'video.%(ext)s')
+
+        try:
+            # Download the video and print its metadata (title, duration) in the same invocation
+            cmd = [
+                "yt-dlp",
+                "-f", format_selector,
+                "-o", template,
+                "--merge-output-format", "mp4",
+                "--no-simulate", "--dump-json",
+                url
+            ]
+            process = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            info = json.loads(process.stdout.strip().splitlines()[-1])
+            metadata = {'title': info.get('title'), 'duration': info.get('duration')}
+
+        except Exception as e:
+            print(f"Error downloading video: {e}")
+            # Fallback to direct method
+            try:
+                print("Trying alternate download method...")
+                cmd = [
+                    "python", "-m", "youtube_dl",
+                    "-f", format_selector,
+                    "-o", template,
+                    url
+                ]
+                subprocess.run(cmd, check=True)
+                metadata = {'title': "Video", 'duration': None}
+            except Exception as e2:
+                print(f"Alternate download also failed: {e2}")
+                return None, None
+
+        downloaded = [name for name in os.listdir(staging_dir) if name.startswith('video.') and not name.endswith('.part')]
+        if not downloaded:
+            print("Download appeared to succeed but file not found")
+            return None, None
+
+        print(f"Successfully downloaded video ID: {video_id}")
+        video_path = self.download_cache.store(video_id, format_selector, staging_dir, downloaded[0], metadata)
+        return video_path, metadata
+
+    def extract_transcript(self, youtube_url):
+        """Extract transcript from YouTube video"""
+        try:
+            video_id = self.extract_video_id(youtube_url)
+            if not video_id:
+                print("Could not extract video ID from URL")
+                return None
+
+            from youtube_transcript_api import YouTubeTranscriptApi
+            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+            return transcript
+        except Exception as e:
+            print(f"Error extracting transcript: {e}")
+            return None
+
+    def score_text_windows(self, texts, batch_size=None):
+        """Score text windows for sentiment and emotions in length-bucketed batches"""
+        if not texts:
+            return [], []
+
+        batch_size = batch_size or self.text_batch_size
+
+        # VADER is a lexicon lookup, so it is cheap to run per window
+        sentiments = [self.sentiment_analyzer.polarity_scores(text) for text in texts]
+
+        # Sort windows by token length so every batch pads to a similar length
+        tokenizer = self.emotion_classifier.tokenizer
+        lengths = [len(ids) for ids in tokenizer(texts, truncation=True)['input_ids']]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+        emotions = [None] * len(texts)
+        with torch.inference_mode():
+            for batch_start in range(0, len(order), batch_size):
+                batch_indices = order[batch_start:batch_start + batch_size]
+                batch_texts = [texts[i] for i in batch_indices]
+                outputs = self.emotion_classifier(batch_texts, batch_size=len(batch_texts), truncation=True)
+
+                # Put results back in window order
+                for i, output in zip(batch_indices, outputs):
+                    emotions[i] = output if isinstance(output, list) else [output]
+
+        return sentiments, emotions
+
+    def interesting_score(self, compound_abs, emotion_score):
+        """Combine sentiment intensity and emotion confidence into a segment score"""
+        weights = self.transcript_score_weights
+        return (compound_abs * weights['sentiment']) + (emotion_score * weights['emotion'])
+
+    def rescore_transcript_segments(self, segments):
+        """Recompute interesting_score with the current weights and re-sort, e.g. for stored segments"""
+        for segment in segments:
+            segment['interesting_score'] = self.interesting_score(abs(segment['sentiment']['compound']),
+                                                                  segment['emotion_score'])
+        segments.sort(key=lambda x: x['interesting_score'], reverse=True)
+        return segments
+
+    def analyze_transcript_segments(self, transcript, batch_size=None, top_k=None):
+        """Analyze transcript for interesting segments based on sentiment and emotions
+
+        With top_k, windows are scored a chunk at a time and only the top_k
+        segments are kept, so memory does not grow with the transcript.
+        """
+        if not transcript:
+            return []
+
+        window_size = 5  # Number of transcript entries to combine for analysis
+        num_windows = len(transcript) - window_size + 1
+        if num_windows <= 0:
+            return []
+
+        batch_size = batch_size or self.text_batch_size
+        # Chunks span several batches so length bucketing still has windows to sort
+        chunk_size = batch_size * 8 if top_k else num_windows
+        top_segments = TopK(top_k) if top_k else None
+        segments = []
+
+        for chunk_start in range(0, num_windows, chunk_size):
+            windows = [transcript[i:i+window_size] for i in range(chunk_start, min(chunk_start + chunk_size, num_windows))]
+            for segment in self._score_transcript_windows(windows, batch_size):
+                if top_segments is not None:
+                    top_segments.push(segment['interesting_score'], segment)
+                else:
+                    segments.append(segment)
+
+        if top_segments is not None:
+            return top_segments.items()
+
+        # Sort segments by interesting score
+        segments.sort(key=lambda x: x['interesting_score'], reverse=True)
+
+        return segments
+
+    def _score_transcript_windows(self, windows, batch_size):
+        """Build the scored segment for each window of transcript entries"""
+        texts = [" ".join([entry['text'] for entry in window]) for window in windows]
+
+        # Analyze sentiment and emotions for all windows in batches
+        sentiments, emotions = self.score_text_windows(texts, batch_size=batch_size)
+
+        segments = []
+        for window, combined_text, sentiment, window_emotions in zip(windows, texts, sentiments, emotions):
+            # Get start and end times
+            start_time = window[0]['start']
+            end_time = window[-1]['start'] + window[-1]['duration']
+
+            # Calculate interesting score based on sentiment intensity and emotions
+            compound_abs = abs(sentiment['compound'])
+            top_emotion = max(window_emotions, key=lambda x: x['score'])
+            emotion_score = top_emotion['score']
+
+            interesting_score = self.interesting_score(compound_abs, emotion_score)
+
+            segments.append({
+                'start': start_time,
+                'end': end_time,
+                'text': combined_text,
+                'sentiment': sentiment,
+                'top_emotion': top_emotion['label'],
+                'emotion_score': emotion_score,
+                'interesting_score': interesting_score
+            })
+
+        return segments
+
+    def extract_audio_features(self, video_path, features=None):
+        """Extract audio features from video file
+
+        Features are computed lazily when read; pass names in features to
+        compute them up front.
+        """
+        # Decode mono audio at the analysis sample rate through an ffmpeg pipe
+        decode_start = time.perf_counter()
+        sr = self.sample_rate
+        try:
+            y = decode_audio(video_path, sr)
+        except (OSError, ImportError) as e:
+            print(f"ffmpeg audio decode unavailable ({e}), falling back to librosa")
+            y, sr = librosa.load(video_path, sr=self.sample_rate)
+
+        audio_features = AudioFeatures(y, sr, hop_length=512, frame_length=2048)
+        audio_features.timings['y'] = time.perf_counter() - decode_start
+
+        if features:
+            audio_features.compute(*features)
+
+        return audio_features
+
+    def stream_audio_peaks(self, video_path, block_seconds=30, hop_length=512, frame_length=2048):
+        """Find audio peak times block by block without holding the decoded track
+
+        RMS and peak picking carry their state across blocks and give the same
+        peaks as the in-memory features. Only peak_times is available on the
+        result.
+        """
+        rms = StreamingRms(frame_length, hop_length)
+        picker = StreamingPeakPicker(**PEAK_PICK_PARAMS)
+        peaks = []
+        for block in iter_audio_blocks(video_path, self.sample_rate, block_seconds):
+            peaks.extend(picker.feed(rms.feed(block)))
+        peaks.extend(picker.feed(rms.finish()))
+        peaks.extend(picker.finish())
+
+        peak_times = np.asarray(peaks, dtype=float) * hop_length / self.sample_rate
+        return AudioFeatures.from_arrays(self.sample_rate, hop_length, frame_length, peak_times=peak_times)
+
+    def sampled_duration(self, video_path, sample_rate=1):
+        """Timestamp of the last frame analyze_video_frames would sample, from container metadata"""
+        cap = cv2.VideoCapture(video_path)
+        frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total_frames <= 0:
+            return 60
+        step = frame_rate * sample_rate
+        last_index = int(round(math.floor((total_frames - 1) / step) * step))
+        if last_index >= total_frames:
+            last_index = int(round((math.floor((total_frames - 1) / step) - 1) * step))
+        return last_index / frame_rate
+
+    def analyze_video_frames(self, video_path, sample_rate=1, sampling='grab', analysis_width=320, batch_size=32,
+                             workers=None, min_samples_per_worker=60, frames_dir='frames', ranges=None):
+        """Analyze video frames for visual interest
+
+        Given (start, end) time ranges, returns a RangeMaxTracker holding the
+        best frame entry in each range instead of every frame entry, so
+        memory stays flat however long the video is.
+        """
+        cap = cv2.VideoCapture(video_path)
+        frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        # Use every available core unless told otherwise, but give each worker
+        # enough samples to be worth a process and a capture of its own
+        workers = workers or available_cpu_count()
+        num_samples = int(total_frames / (frame_rate * sample_rate)) + 1 if total_frames > 0 else 0
+        workers = max(1, min(workers, num_samples // min_samples_per_worker))
+
+        frame_store = FrameStore(video_path, frames_dir=frames_dir)
+        if workers == 1:
+            frame_scores, range_store = analyze_frame_range(video_path, 0, None, sample_rate, sampling,
+                                                            analysis_width, batch_size, frame_store.frames_dir, ranges)
+            frame_store.merge(range_store)
+            if ranges is not None:
+                return frame_scores, frame_store
+        else:
+            # Split the timeline into contiguous frame ranges, one per worker. The
+            # sampling grid is global, so each range scores exactly the frames the
+            # serial path would. The last range is open-ended in case the
+            # container's frame count is short.
+            bounds = [int(total_frames * i / workers) for i in range(workers)] + [None]
+            jobs = [(video_path, bounds[i], bounds[i + 1], sample_rate, sampling,
+                     analysis_width, batch_size, frame_store.frames_dir, ranges) for i in range(workers)]
+
+            frame_scores = []
+            tracker = RangeMaxTracker(ranges) if ranges is not None else None
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_frame_worker,
+                                     mp_context=process_pool_context()) as executor:
+                # map() returns results in range order, which is timestamp order
+                for range_scores, range_store in executor.map(_analyze_frame_range_job, jobs):
+                    if tracker is not None:
+                        tracker.merge(range_scores)
+                    else:
+                        frame_scores.extend(range_scores)
+                    frame_store.merge(range_store)
+
+            if tracker is not None:
+                return tracker, frame_store
+
+        # Sort frames by visual interest
+        frame_scores.sort(key=lambda x: x['visual_score'], reverse=True)
+
+        return frame_scores, frame_store
+
+    def identify_clip_boundaries(self, transcript_segments, audio_features, frame_scores, min_duration=10, max_duration=60):
+        """Identify optimal clip boundaries based on transcript, audio, and visual features"""
+        # Index frames by timestamp so every lookup is a binary search
+        frame_index = FrameRangeIndex(frame_scores)
+
+        potential_clips = self.candidate_clips(transcript_segments, audio_features, frame_index.duration(),
+                                               min_duration=min_duration, max_duration=max_duration)
+        for clip in potential_clips:
+            # Find the most visually interesting frame within the clip
+            self.attach_visual_frame(clip, frame_index.top_frame(clip['start'], clip['end']))
+
+        return self.select_clips(potential_clips)
+
+    def attach_visual_frame(self, clip, top_visual_frame):
+        clip['top_visual_frame'] = top_visual_frame['frame_path'] if top_visual_frame else None
+        clip['top_visual_frame_index'] = top_visual_frame['frame_index'] if top_visual_frame else None
+        clip['visual_score'] = top_visual_frame['visual_score'] if top_visual_frame else 0
+        return clip
+
+    def candidate_clips(self, transcript_segments, audio_features, video_duration, min_duration=10, max_duration=60):
+        """Candidate clip ranges from the top transcript segments, or from audio peaks without a transcript"""
+        potential_clips = []
+
+        # Keep peaks as a sorted array so every lookup is a binary search
+        sorted_peaks = np.sort(np.asarray(audio_features['peak_times'], dtype=float))
+
+        # If no transcript segments were found, create segments based on audio and visual features
+        if not transcript_segments:
+            print("No transcript segments available. Creating segments based on audio and visual features.")
+            # Use audio peaks as starting points for segments
+            peak_times = sorted_peaks
+
+            # Ensure we have at least some peak times
+            if len(peak_times) < 2:
+                # If no peaks, create segments based on regular intervals
+                num_segments = max(1, int(video_duration / 20))  # Create a segment every 20 seconds
+                peak_times = np.linspace(0, video_duration, num_segments)
+
+            # Create segments from peaks
+            for i, peak in enumerate(peak_times[:-1]):
+                segment_start = peak
+                segment_end = min(peak_times[i+1], segment_start + max_duration)
+
+                # If segment is too short, extend it
+                if segment_end - segment_start < min_duration:
+                    segment_end = min(segment_start + min_duration, video_duration)
+
+                potential_clips.append({
+                    'start': segment_start,
+                    'end': segment_end,
+                    'duration': segment_end - segment_start,
+                    'text': "No transcript available",
+                    'sentiment': {'compound': 0},
+                    'top_emotion': 'neutral',
+                    'interesting_score': 0.5  # Default score
+                })
+        else:
+            # Get top transcript segments
+            top_segments = transcript_segments[:self.max_candidate_segments]
+
+            for segment in top_segments:
+                segment_start = segment['start']
+                segment_end = segment['end']
+
+                # Find nearest audio peaks before and after segment
+                before = bisect.bisect_right(sorted_peaks, segment_start) - 1
+                after = bisect.bisect_left(sorted_peaks, segment_end)
+                nearest_peak_before = sorted_peaks[before] if before >= 0 else segment_start
+                nearest_peak_after = sorted_peaks[after] if after < len(sorted_peaks) else segment_end
+
+                # Expand boundaries to include audio peaks if within reasonable distance
+                if segment_start - nearest_peak_before < 5:  # Within 5 seconds
+                    adjusted_start = nearest_peak_before
+                else:
+                    adjusted_start = segment_start
+
+                if nearest_peak_after - segment_end < 5:  # Within 5 seconds
+                    adjusted_end = nearest_peak_after
+                else:
+                    adjusted_end = segment_end
+
+                # Make sure clip is not too short or too long
+                duration = adjusted_end - adjusted_start
+                if duration < min_duration:
+                    # Extend clip to minimum duration
+                    extension = (min_duration - duration) / 2
+                    adjusted_start = max(0, adjusted_start - extension)
+                    adjusted_end = adjusted_end + extension
+                elif duration > max_duration:
+                    # Trim clip to maximum duration
+                    middle = (adjusted_start + adjusted_end) / 2
+                    adjusted_start = middle - (max_duration / 2)
+                    adjusted_end = middle + (max_duration / 2)
+
+                potential_clips.append({
+                    'start': adjusted_start,
+                    'end': adjusted_end,
+                    'duration': adjusted_end - adjusted_start,
+                    'text': segment['text'],
+                    'sentiment': segment['sentiment'],
+                    'top_emotion': segment['top_emotion'],
+                    'interesting_score': segment['interesting_score']
+                })
+
+        return potential_clips
+
+    def select_clips(self, potential_clips):
+        """Pick up to 10 non-overlapping clips by interesting and visual score and add frame-precise timestamps"""
+        # Remove overlapping clips (prefer higher interesting_score)
+        potential_clips.sort(key=lambda x: x['interesting_score'] + x['visual_score'], reverse=True)
+        final_clips = []
+        selected_intervals = IntervalSet()
+
+        for clip in potential_clips:
+            # Check if this clip overlaps with any already selected clip
+            if not selected_intervals.overlaps(clip['start'], clip['end']):
+                final_clips.append(clip)
+                selected_intervals.add(clip['start'], clip['end'])
+
+            # Stop once we have enough non-overlapping clips
+            if len(final_clips) >= 10:
+                break
+
+        for clip in final_clips:
+        # Format start and end times as HH:MM:SS
+          clip['start_formatted'] = str(timedelta(seconds=int(clip['start'])))
+          clip['end_formatted'] = str(timedelta(seconds=int(clip['end'])))
+
+        # Add frame-precise timestamps (if available)
+          fps = 30  # Assuming 30fps, adjust if needed
+          clip['start_frame'] = int(clip['start'] * fps)
+          clip['end_frame'] = int(clip['end'] * fps)
+
+        return final_clips
+
+    def generate_captions(self, video_path, clip_data, style='large_centered'):
+        """Generate stylized captions for the video clip"""
+        transcript = clip_data['text']
+
+        if style == 'large_centered':
+            generator = lambda txt: self.overlay_cache.text_clip(
+                txt, font='Arial-Bold', fontsize=50, color='white', stroke_color='black',
+                stroke_width=2, method='caption', align='center', size=(720, None)
+            ).set_position(('center', 'center'))
+
+        elif style == 'subtitle':
+            generator = lambda txt: self.overlay_cache.text_clip(
+                txt, font='Arial', fontsize=30, color='white', stroke_color='black',
+                stroke_width=1.5, method='caption', align='center', size=(720, None)
+            ).set_position(('center', 0.85), relative=True)
+
+        elif style == 'dynamic':
+            # For dynamic style, we'll make shorter words larger
+            words = transcript.split()
+            if len(words) <= 3:
+                fontsize = 65
+            elif len(words) <= 6:
+                fontsize = 50
+            else:
+                fontsize = 35
+
+            generator = lambda txt: self.overlay_cache.text_clip(
+                txt, font='Arial-Bold', fontsize=fontsize, color='white', stroke_color='black',
+                stroke_width=2, method='caption', align='center', size=(720, None)
+            ).set_position(('center', 'center'))
+
+        return generator(transcript)
+
+    def crop_to_platform(self, clip, platform='youtube_shorts'):
+        """Crop or resize a clip to the platform's aspect ratio"""
+        specs = self.platform_specs[platform]
+
+        # Apply aspect ratio
+        if specs['aspect_ratio'] == '9:16':
+            # Crop to vertical format
+            clip_width = clip.w
+            clip_height = clip.h
+            target_width = clip_height * 9 / 16
+
+            if target_width <= clip_width:
+                # Crop width
+                x_center = clip_width / 2
+                clip = clip.crop(x1=x_center - target_width/2, y1=0,
+                                 x2=x_center + target_width/2, y2=clip_height)
+            else:
+                # Need to add black bars
+                clip = clip.resize(height=clip_height, width=target_width)
+
+        return clip
+
+    def decorate_platform_clip(self, video_path, clip, clip_data, platform='youtube_shorts'):
+        """Add captions, the intro banner and platform branding to a cropped clip"""
+        specs = self.platform_specs[platform]
+
+        # Add captions
+        caption = self.generate_captions(video_path, clip_data, style=specs['caption_style'])
+
+        # Set caption duration to match the clip duration
+        caption = caption.set_duration(clip.duration)
+
+        # Composite the clip with captions
+        final_clip = mp.CompositeVideoClip([clip, caption])
+
+        # Add intro and outro
+        intro_text = self.overlay_cache.text_clip(
+            f"Top moment - {clip_data['top_emotion'].upper()}",
+            fontsize=40, color='white', bg_color='rgba(0,0,0,0.5)',
+            size=(clip.w, None), method='caption', align='center'
+        ).set_duration(2.0)
+
+        intro_text = intro_text.set_position(('center', 'top'))
+
+        if clip.duration > 2.0:
+            final_clip = mp.concatenate_videoclips([
+                mp.CompositeVideoClip([clip.subclip(0, 2), intro_text]),
+                final_clip.subclip(2)
+            ])
+
+        # Add platform-specific branding or effects
+        if platform == 'youtube_shorts':
+            logo_text = self.overlay_cache.text_clip(
+                "#Shorts", fontsize=30, color='white', font='Arial-Bold',
+                bg_color='rgba(255,0,0,0.6)', padding_x=10, method='caption'
+            ).set_duration(final_clip.duration)
+            logo_text = logo_text.set_position((0.05, 0.05), relative=True)
+            final_clip = mp.CompositeVideoClip([final_clip, logo_text])
+
+        elif platform == 'instagram_reels':
+            logo_text = self.overlay_cache.text_clip(
+                "Reels", fontsize=30, color='white', font='Arial-Bold',
+                bg_color='rgba(225,48,108,0.6)', padding_x=10, method='caption'
+            ).set_duration(final_clip.duration)
+            logo_text = logo_text.set_position((0.05, 0.05), relative=True)
+            final_clip = mp.CompositeVideoClip([final_clip, logo_text])
+
+        elif platform == 'tiktok':
+            logo_text = self.overlay_cache.text_clip(
+                "TikTok", fontsize=30, color='white', font='Arial-Bold',
+                bg_color='rgba(0,0,0,0.6)', padding_x=10, method='caption'
+            ).set_duration(final_clip.duration)
+            logo_text = logo_text.set_position((0.05, 0.05), relative=True)
+            final_clip = mp.CompositeVideoClip([final_clip, logo_text])
+
+        return final_clip
+
+    def create_platform_specific_clip(self, video_path, clip_data, platform='youtube_shorts'):
+        """Create a clip optimized for a specific platform"""
+        specs = self.platform_specs[platform]
+
+        # Load video
+        video = mp.VideoFileClip(video_path)
+
+        # Extract clip
+        start_time = max(0, clip_data['start'])
+        end_time = min(clip_data['end'], start_time + specs['max_length'], video.duration)
+        clip = video.subclip(start_time, end_time)
+
+        clip = self.crop_to_platform(clip, platform)
+        return self.decorate_platform_clip(video_path, clip, clip_data, platform)
+
+    def render_platform_clips(self, video_path, clip_data, output_paths, threads=None):
+        """Render every platform variant of a clip from a single decode of its time range
+
+        The clip range is decoded and cropped to the shared 9:16 base once; each
+        base frame is cached so all variants composite their captions and badges
+        over the same decoded frame, and one encoder per variant is fed in the
+        same pass. Returns a dict of platform -> output path (None on failure).
+        """
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        platforms = list(output_paths)
+        video = mp.VideoFileClip(video_path)
+        fps = video.fps
+
+        # Decode and crop the longest range any platform needs, once
+        start_time = max(0, clip_data['start'])
+        longest = max(self.platform_specs[platform]['max_length'] for platform in platforms)
+        base_end = min(clip_data['end'], start_time + longest, video.duration)
+        base = self.crop_to_platform(video.subclip(start_time, base_end), platforms[0])
+
+        # Cache the last decoded base frame by frame number so every variant reuses it
+        frame_cache = {}
+
+        def shared_frame(get_frame, t):
+            key = int(round(t * fps))
+            if key not in frame_cache:
+                frame_cache.clear()
+                frame_cache[key] = get_frame(t)
+            return frame_cache[key]
+
+        base = base.fl(shared_frame)
+
+        variants = {}
+        results = {}
+        for platform in platforms:
+            specs = self.platform_specs[platform]
+            duration = min(base.duration, clip_data['end'] - start_time, specs['max_length'])
+            try:
+                clip = base.subclip(0, duration)
+                variants[platform] = self.decorate_platform_clip(video_path, clip, clip_data, platform)
+            except Exception as e:
+                print(f"Error creating clip for {platform}: {e}")
+                results[platform] = None
+
+        # Variants of equal length share one encoded audio track
+        audio_files = {}
+        writers = {}
+        try:
+            for platform, variant in variants.items():
+                audio_file = None
+                if base.audio is not None:
+                    key = round(variant.duration, 3)
+                    if key not in audio_files:
+                        audio_files[key] = f"{os.path.splitext(output_paths[platform])[0]}_audio.m4a"
+                        base.audio.subclip(0, variant.duration).write_audiofile(
+                            audio_files[key], fps=44100, codec='aac', logger=None)
+                    audio_file = audio_files[key]
+
+                writers[platform] = FFMPEG_VideoWriter(output_paths[platform], variant.size, fps,
+                                                       codec='libx264', audiofile=audio_file, threads=threads)
+
+            # One pass over the timeline feeds every encoder from the shared frame
+            longest_variant = max((variant.duration for variant in variants.values()), default=0)
+            for frame_number in range(int(math.ceil(longest_variant * fps))):
+                t = frame_number / fps
+                for platform, variant in variants.items():
+                    if platform in writers and t < variant.duration:
+                        try:
+                            writers[platform].write_frame(variant.get_frame(t).astype('uint8'))
+                        except Exception as e:
+                            print(f"Error creating clip for {platform}: {e}")
+                            writers.pop(platform).close()
+                            results[platform] = None
+
+            for platform in list(writers):
+                writers.pop(platform).close()
+                results[platform] = output_paths[platform]
+        finally:
+            # Writers still open here were interrupted by an error: stop their encoders
+            # and drop the incomplete files
+            for platform, writer in writers.items():
+                try:
+                    writer.close()
+                except Exception as e:
+                    print(f"Error closing writer for {platform}: {e}")
+                if os.path.exists(output_paths[platform]):
+                    os.remove(output_paths[platform])
+            for audio_file in audio_files.values():
+                if os.path.exists(audio_file):
+                    os.remove(audio_file)
+            video.close()
+
+        return {platform: results.get(platform) for platform in platforms}
+
+    def render_clip(self, video_path, clip_data, output_paths, render_mode='shared', render_backend='moviepy',
+                    threads=None):
+        """Render every platform variant of a clip with the chosen backend
+
+        render_backend='ffmpeg' renders through a native ffmpeg filtergraph;
+        'moviepy' composites in moviepy, either from one shared decode
+        (render_mode='shared') or one render per platform ('per_platform').
+        """
+        if render_backend == 'ffmpeg':
+            return FFmpegShortsRenderer(self.platform_specs).render(video_path, clip_data, output_paths, threads)
+
+        if render_mode == 'shared':
+            return self.render_platform_clips(video_path, clip_data, output_paths, threads)
+
+        platform_clips = {}
+        for platform, output_path in output_paths.items():
+            try:
+                clip = self.create_platform_specific_clip(video_path, clip_data, platform)
+                clip.write_videofile(output_path, codec='libx264', audio_codec='aac', threads=threads)
+                platform_clips[platform] = output_path
+            except Exception as e:
+                print(f"Error creating clip for {platform}: {e}")
+                platform_clips[platform] = None
+        return platform_clips
+
+    def optimize_for_virality(self, clips):
+        """Apply additional virality optimization based on content type"""
+        optimized_clips = []
+
+        for clip in clips:
+            # Determine content type based on emotion and sentiment
+            emotion = clip['top_emotion']
+            sentiment = clip['sentiment']['compound']
+
+            # Create a copy to avoid modifying the original
+            optimized_clip = clip.copy()
+
+            # Apply optimization based on content type
+            if emotion in ['joy', 'surprise'] and sentiment > 0.3:
+                # Upbeat, positive content
+                optimized_clip['virality_score'] = clip['interesting_score'] * 1.3
+                optimized_clip['optimal_platform'] = 'youtube_shorts'
+                optimized_clip['recommended_tags'] = ['funny', 'entertainment', 'joy', 'feel-good']
+
+            elif emotion in ['anger', 'disgust'] and sentiment < -0.3:
+                # Controversial or reaction content
+                optimized_clip['virality_score'] = clip['interesting_score'] * 1.2
+                optimized_clip['optimal_platform'] = 'tiktok'
+                optimized_clip['recommended_tags'] = ['reaction', 'opinion', 'controversy']
+
+            elif emotion in ['sadness', 'fear']:
+                # Emotional or storytelling content
+                optimized_clip['virality_score'] = clip['interesting_score'] * 1.1
+                optimized_clip['optimal_platform'] = 'instagram_reels'
+                optimized_clip['recommended_tags'] = ['emotional', 'story', 'perspective']
+
+            else:
+                # Neutral or informative content
+                optimized_clip['virality_score'] = clip['interesting_score']
+                optimized_clip['optimal_platform'] = 'youtube_shorts'
+                optimized_clip['recommended_tags'] = ['information', 'tips', 'learn']
+
+            optimized_clips.append(optimized_clip)
+
+        # Sort by virality score
+        optimized_clips.sort(key=lambda x: x['virality_score'], reverse=True)
+
+        return optimized_clips
+
+    def clip_metadata(self, i, clip_data, video_title, platform_clips):
+        """Build the metadata record for the i-th (0-based) rendered clip"""
+        # Determine best platform
+        best_platform = clip_data.get('optimal_platform', 'youtube_shorts')
+
+        return {
+            'clip_index': i+1,
+            'video_title': video_title,
+            'start_time': str(timedelta(seconds=int(clip_data['start']))),
+            'end_time': str(timedelta(seconds=int(clip_data['end']))),
+            'start_seconds': float(clip_data['start']),  # Store raw seconds for sorting
+            'end_seconds': float(clip_data['end']),      # Store raw seconds for reference
+            'start_formatted': clip_data.get('start_formatted', str(timedelta(seconds=int(clip_data['start'])))),
+            'end_formatted': clip_data.get('end_formatted', str(timedelta(seconds=int(clip_data['end'])))),
+            'duration': int(clip_data['end'] - clip_data['start']),
+            'text_content': clip_data['text'],
+            'emotion': clip_data['top_emotion'],
+            'sentiment': clip_data['sentiment']['compound'],
+            'virality_score': clip_data.get('virality_score', clip_data['interesting_score']),
+            'recommended_tags': clip_data.get('recommended_tags', []),
+            'best_platform': best_platform,
+            'file_paths': platform_clips,
+            'thumbnail': clip_data['top_visual_frame']
+        }
+
+    def fetch_clip_ranges(self, source, clips, range_dir, max_workers=4):
+        """Fetch full-resolution media for just the clip ranges; returns one path (or None) per clip"""
+        os.makedirs(range_dir, exist_ok=True)
+
+        def fetch(i, clip_data):
+            start_time = max(0, clip_data['start'])
+            output_path = os.path.join(range_dir, f"range_{i+1}_{int(start_time)}-{int(clip_data['end'])}.mp4")
+            return source.fetch_range(start_time, clip_data['end'], output_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fetch, range(len(clips)), clips))
+
+    def save_features(self, key, transcript_segments, audio_features, frame_scores, settings):
+        """Store analysis features; a failed cache write is reported but never fails the job"""
+        try:
+            self.feature_store.save(key, transcript_segments, audio_features, frame_scores, settings)
+        except (OSError, ValueError) as e:
+            print(f"Could not store analysis features: {e}")
+
+    def process_video(self, youtube_url, num_clips=5, render_mode='shared', render_backend='moviepy',
+                      render_workers=None, cpu_budget=None, analysis_mode='full', source=None,
+                      min_duration=10, max_duration=60, use_feature_store=True, workspace=None, long_form=False):
+        """Process YouTube video and generate multiple optimized clips
+
+        With analysis_mode='proxy' all analysis runs on a low-resolution proxy
+        and full-resolution media is only fetched for the selected clip
+        ranges. source overrides where media comes from (default: the YouTube
+        URL); pass a LocalFileSource to run without the network.
+
+        long_form=True keeps analysis memory flat for multi-hour videos: audio
+        is analyzed in blocks, only the top transcript segments are kept, and
+        frames are scored in one pass against the candidate clip ranges
+        instead of being collected. Stored features are not used in this mode.
+
+        Every file the job writes goes to its JobWorkspace (a fresh one under
+        jobs/ by default), so several jobs can run on one host at once.
+        Use iter_process_video to receive each clip as soon as it is rendered.
+        """
+        results = None
+        for event in self.iter_process_video(youtube_url, num_clips, render_mode, render_backend, render_workers,
+                                             cpu_budget, analysis_mode, source, min_duration, max_duration,
+                                             use_feature_store, workspace, long_form):
+            if event['event'] == 'done':
+                results = event['clips']
+        return results
+
+    def iter_process_video(self, youtube_url, num_clips=5, render_mode='shared', render_backend='moviepy',
+                           render_workers=None, cpu_budget=None, analysis_mode='full', source=None,
+                           min_duration=10, max_duration=60, use_feature_store=True, workspace=None,
+                           long_form=False):
+        """Run process_video as a generator of progress events
+
+        Takes the same arguments as process_video and yields dicts with an
+        'event' key:
+            {'event': 'stage', 'stage': name, 'seconds': s}   an analysis stage finished
+            {'event': 'clip', 'index': i, 'clip': metadata, 'error': e}
+                                                              a clip finished rendering
+            {'event': 'done', 'clips': [metadata], 'metadata_path': path}
+            {'event': 'error', 'message': text}               the job could not run
+
+        Clips are yielded in the order they finish, which is not clip order.
+        """
+        if workspace is None:
+            with JobWorkspace() as workspace:
+                yield from self.iter_process_video(youtube_url, num_clips, render_mode, render_backend,
+                                                   render_workers, cpu_budget, analysis_mode, source,
+                                                   min_duration, max_duration, use_feature_store, workspace,
+                                                   long_form)
+            return
+        workspace.create()
+
+        source = source or YouTubeSource(self, youtube_url)
+        # Long-form analysis keeps no per-frame or per-sample arrays to store
+        use_feature_store = use_feature_store and not long_form
+        analysis_format = PROXY_FORMAT if analysis_mode == 'proxy' else FULL_FORMAT
+
+        def instrumented(stage, function, count=len):
+            """Wrap a stage function so it emits a record with its item count"""
+            def run(*args):
+                with self.instrumentation.stage(stage, job_id=workspace.job_id) as record:
+                    result = function(*args)
+                    record['items'] = count(result) if result is not None else 0
+                    return result
+            return run
+
+        # Steps 1-5 are independent until boundary selection, so run them as a DAG:
+        # the transcript fetch and scoring overlap the download, and audio and
+        # frame analysis run side by side once the video is on disk. Profiling
+        # captures are process-wide, so stages run one at a time while capturing.
+        stages = StageGraph(max_workers=1 if self.instrumentation.capture else None)
+
+        # Step 1: Download the video (or its analysis proxy)
+        stages.add('download', instrumented('download', lambda: source.fetch(analysis_format),
+                                            count=lambda download: int(download[0] is not None)))
+
+        # Step 2: Extract transcript
+        stages.add('transcript', instrumented('transcript',
+                                              lambda: self.extract_transcript(youtube_url) if youtube_url else None))
+
+        # Look up features stored by an earlier run on the same content and settings
+        feature_settings = {'analysis_format': analysis_format, 'sample_rate': self.sample_rate,
+                            'frame_sample_rate': 1, 'analysis_width': 320, 'window_size': 5}
+
+        # Set once stored transcript segments are known to exist, so scoring that has not
+        # started yet can skip itself; scoring never waits for the lookup
+        stored_segments_found = threading.Event()
+
+        def lookup_features(download):
+            if not (use_feature_store and download[0]):
+                return None, None
+            key = self.feature_store.key(download[0], feature_settings)
+            stored = self.feature_store.load(key, frames_dir=workspace.frames_dir)
+            if stored and stored[0] is not None:
+                stored_segments_found.set()
+            return key, stored
+
+        stages.add('stored_features', lookup_features, 'download')
+
+        # Step 3: Analyze transcript for interesting segments (stored segments win when results are joined)
+        top_k = self.max_candidate_segments if long_form else None
+        stages.add('transcript_segments',
+                   instrumented('transcript_scoring',
+                                lambda transcript: self.analyze_transcript_segments(transcript, top_k=top_k)
+                                if transcript and not stored_segments_found.is_set() else []),
+                   'transcript')
+
+        if not long_form:
+            # Step 4: Extract audio features (peaks are computed inside the stage so the work overlaps)
+            stages.add('audio',
+                       instrumented('audio',
+                                    lambda download, stored: self.extract_audio_features(download[0],
+                                                                                         features=('peak_times',))
+                                    if download[0] and not stored[1] else None,
+                                    count=lambda audio_features: len(audio_features['y'])),
+                       'download', 'stored_features')
+
+            # Step 5: Analyze video frames
+            stages.add('frames',
+                       instrumented('frames',
+                                    lambda download, stored: self.analyze_video_frames(download[0],
+                                                                                       frames_dir=workspace.frames_dir)
+                                    if download[0] and not stored[1] else None,
+                                    count=lambda frames: len(frames[0])),
+                       'download', 'stored_features')
+        else:
+            # Step 4: Stream the audio track block by block, keeping only peak times
+            stages.add('audio',
+                       instrumented('audio', lambda download: self.stream_audio_peaks(download[0])
+                                    if download[0] else None,
+                                    count=lambda audio_features: len(audio_features['peak_times'])),
+                       'download')
+
+            # Step 5: Candidate ranges are known once transcript and audio are, so one
+            # frame pass only tracks the best frame inside each of them
+            def long_form_frames(download, transcript_segments, audio_features):
+                if not download[0]:
+                    return None
+                candidates = self.candidate_clips(transcript_segments, audio_features,
+                                                  self.sampled_duration(download[0]),
+                                                  min_duration=min_duration, max_duration=max_duration)
+                tracker, frame_store = self.analyze_video_frames(
+                    download[0], frames_dir=workspace.frames_dir,
+                    ranges=[(clip['start'], clip['end']) for clip in candidates])
+                return (candidates, tracker), frame_store
+
+            stages.add('frames',
+                       instrumented('frames', long_form_frames, count=lambda frames: frames[0][1].frames_seen),
+                       'download', 'transcript_segments', 'audio')
+
+        stage_results = {}
+        for name, result in stages.iter_run():
+            stage_results[name] = result
+            yield {'event': 'stage', 'stage': name, 'seconds': stages.timings[name]}
+        print("Stage times: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stages.timings.items()))
+
+        video_path, video_title = stage_results['download']
+        if not video_path:
+            yield {'event': 'error', 'message': 'Could not download video.'}
+            return
+
+        feature_key, stored_features = stage_results['stored_features']
+        if not stage_results['transcript'] and not (stored_features and stored_features[0] is not None):
+            print("No transcript available. Using alternative analysis methods.")
+
+        if stored_features:
+            print("Using stored analysis features.")
+            stored_segments, audio_features, frame_scores = stored_features
+            frame_store = FrameStore(video_path, frames_dir=workspace.frames_dir)
+            if stored_segments is not None:
+                transcript_segments = self.rescore_transcript_segments(stored_segments)
+            else:
+                # The storing run had no transcript; use this run's and store it if it got one
+                transcript_segments = stage_results['transcript_segments']
+                if stage_results['transcript']:
+                    self.save_features(feature_key, transcript_segments, audio_features, frame_scores,
+                                       feature_settings)
+        else:
+            transcript_segments = stage_results['transcript_segments']
+            audio_features = stage_results['audio']
+            frame_scores, frame_store = stage_results['frames']
+
+            if feature_key:
+                self.save_features(feature_key, transcript_segments if stage_results['transcript'] else None,
+                                   audio_features, frame_scores, feature_settings)
+
+        # Step 6: Identify optimal clip boundaries
+        with self.instrumentation.stage('boundaries', job_id=workspace.job_id) as record:
+            if long_form:
+                candidates, tracker = frame_scores
+                for clip, top_visual_frame in zip(candidates, tracker.best):
+                    self.attach_visual_frame(clip, top_visual_frame)
+                potential_clips = self.select_clips(candidates)
+            else:
+                potential_clips = self.identify_clip_boundaries(transcript_segments, audio_features, frame_scores,
+                                                                min_duration=min_duration, max_duration=max_duration)
+            record['items'] = len(potential_clips)
+        yield {'event': 'stage', 'stage': 'boundaries', 'seconds': record['seconds']}
+
+        # Only write thumbnails for the frames the clips use (proxy resolution in proxy mode)
+        frame_store.materialize([clip['top_visual_frame_index'] for clip in potential_clips
+                                 if clip['top_visual_frame_index'] is not None])
+
+        # Step 7: Optimize clips for virality
+        with self.instrumentation.stage('virality', job_id=workspace.job_id) as record:
+            optimized_clips = self.optimize_for_virality(potential_clips)
+            record['items'] = len(optimized_clips)
+        yield {'event': 'stage', 'stage': 'virality', 'seconds': record['seconds']}
+
+        # Step 8: Generate platform-specific clips, encoding several clips at once
+        platforms = ['youtube_shorts', 'instagram_reels', 'tiktok']
+        selected_clips = optimized_clips[:num_clips]
+
+        # In proxy mode render from full-resolution cuts of just the selected ranges
+        if analysis_mode == 'proxy':
+            range_paths = self.fetch_clip_ranges(source, selected_clips, range_dir=workspace.scratch_path('ranges'))
+        else:
+            range_paths = [None] * len(selected_clips)
+
+        jobs = []
+        for i, (clip_data, range_path) in enumerate(zip(selected_clips, range_paths)):
+            output_paths = {
+                platform: workspace.output_path(f'{i+1}_{platform}_{int(clip_data["start"])}-{int(clip_data["end"])}.mp4')
+                for platform in platforms
+            }
+            if range_path:
+                # The range file starts at the clip start, so shift the clip to match
+                start_time = max(0, clip_data['start'])
+                render_data = dict(clip_data, start=0, end=clip_data['end'] - start_time)
+                jobs.append((range_path, render_data, output_paths, render_mode, render_backend))
+            else:
+                jobs.append((video_path, clip_data, output_paths, render_mode, render_backend))
+
+        scheduler = RenderScheduler(cpu_budget=cpu_budget, max_parallel=render_workers,
+                                    platform_specs=self.platform_specs, instrumentation=self.instrumentation,
+                                    record_fields={'job_id': workspace.job_id})
+        results = [None] * len(jobs)
+        for i, platform_clips, error in scheduler.iter_results(jobs):
+            if error:
+                print(f"Error rendering clip {i+1}: {error}")
+            results[i] = self.clip_metadata(i, selected_clips[i], video_title, platform_clips)
+            yield {'event': 'clip', 'index': i, 'clip': results[i], 'error': error}
+
+        # Save metadata
+        metadata_path = workspace.output_path('clip_metadata.json')
+        with open(metadata_path, 'w') as f:
+            json.dump(results, f, indent=4)
+
+        yield {'event': 'done', 'clips': results, 'metadata_path': metadata_path}
+
+    async def aiter_process_video(self, *args, **kwargs):
+        """Async version of iter_process_video; the pipeline runs on a worker thread
+
+        fastapi_server does not call the analyzer yet: its /videos/{video_id}/generate-shorts
+        background task and /shorts routes write placeholder shorts. This is the
+        entry point for wiring the pipeline in, one event per progress update.
+        """
+        loop = asyncio.get_running_loop()
+        events = self.iter_process_video(*args, **kwargs)
+        finished = object()
+        pending = None
+        try:
+            while True:
+                pending = loop.run_in_executor(None, next, events, finished)
+                # Shielded so cancelling the consumer leaves next() to finish on its thread
+                event = await asyncio.shield(pending)
+                if event is finished:
+                    break
+                yield event
+        finally:
+            # A generator cannot be closed while next() is running, so wait for the
+            # in-flight step before running its cleanup (workspace, executors)
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            await loop.run_in_executor(None, events.close)
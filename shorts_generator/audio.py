@@ -0,0 +1,137 @@
+"""Audio decoding and the lazily computed audio feature graph"""
+import subprocess
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+from .lazy import lazy_import
+from .runtime import ffmpeg_binary
+
+librosa = lazy_import('librosa')
+
+def decode_audio_command(media_path, sample_rate=22050):
+    """ffmpeg argv that writes a media file's audio to stdout as mono float32 samples"""
+    return [
+        ffmpeg_binary(), '-nostdin', '-v', 'error',
+        '-i', media_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-acodec', 'pcm_f32le', 'pipe:1'
+    ]
+
+def decode_audio(media_path, sample_rate=22050):
+    """Decode the audio track of a media file straight into a mono float32 array"""
+    cmd = decode_audio_command(media_path, sample_rate)
+    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+# Audio features are nodes in a small dependency graph: name -> (dependencies, compute function).
+# Each compute function receives the AudioFeatures object and its resolved dependencies.
+AUDIO_FEATURES = {}
+
+def audio_feature(name, *dependencies):
+    """Register an audio feature computed from the named dependencies"""
+    def decorator(compute):
+        AUDIO_FEATURES[name] = (dependencies, compute)
+        return compute
+    return decorator
+
+@audio_feature('rms', 'y')
+def _audio_rms(features, y):
+    # Audio energy (volume) over time
+    return librosa.feature.rms(y=y, frame_length=features.frame_length, hop_length=features.hop_length)[0]
+
+@audio_feature('times', 'rms')
+def _audio_times(features, rms):
+    return librosa.times_like(rms, sr=features.sr, hop_length=features.hop_length)
+
+# Peak picking over RMS frames, shared with the streaming long-form path
+PEAK_PICK_PARAMS = {'pre_max': 10, 'post_max': 10, 'pre_avg': 10, 'post_avg': 10, 'delta': 0.2, 'wait': 10}
+
+@audio_feature('peaks', 'rms')
+def _audio_peaks(features, rms):
+    # Audio peaks (potential exciting moments)
+    return librosa.util.peak_pick(rms, **PEAK_PICK_PARAMS)
+
+@audio_feature('peak_times', 'times', 'peaks')
+def _audio_peak_times(features, times, peaks):
+    return times[peaks]
+
+@audio_feature('beat_track', 'y')
+def _audio_beat_track(features, y):
+    return librosa.beat.beat_track(y=y, sr=features.sr)
+
+@audio_feature('tempo', 'beat_track')
+def _audio_tempo(features, beat_track):
+    return beat_track[0]
+
+@audio_feature('beat_times', 'beat_track')
+def _audio_beat_times(features, beat_track):
+    return librosa.frames_to_time(beat_track[1], sr=features.sr)
+
+@audio_feature('onset_strength', 'y')
+def _audio_onset_strength(features, y):
+    return librosa.onset.onset_strength(y=y, sr=features.sr, hop_length=features.hop_length)
+
+@audio_feature('stft_magnitude', 'y')
+def _audio_stft_magnitude(features, y):
+    return np.abs(librosa.stft(y, n_fft=features.frame_length, hop_length=features.hop_length))
+
+@audio_feature('spectral_flux', 'stft_magnitude')
+def _audio_spectral_flux(features, stft_magnitude):
+    # Positive spectral change between consecutive frames
+    rise = np.maximum(0, np.diff(stft_magnitude, axis=1))
+    return np.concatenate([[0.0], np.sqrt(np.sum(rise ** 2, axis=0))])
+
+class AudioFeatures(Mapping):
+    """Lazily computed audio features
+
+    Behaves like the dict extract_audio_features used to return, but each
+    feature (and its dependencies) is only computed the first time it is
+    read. timings records the seconds spent computing each feature itself.
+    """
+
+    def __init__(self, y, sr, hop_length=512, frame_length=2048, graph=None):
+        self.sr = sr
+        self.hop_length = hop_length
+        self.frame_length = frame_length
+        self.graph = graph if graph is not None else AUDIO_FEATURES
+        self.timings = {}
+        self._values = {'y': y}
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name not in self.graph:
+            raise KeyError(name)
+
+        dependencies, compute = self.graph[name]
+        args = [self[dependency] for dependency in dependencies]
+
+        compute_start = time.perf_counter()
+        value = compute(self, *args)
+        self.timings[name] = time.perf_counter() - compute_start
+
+        self._values[name] = value
+        return value
+
+    def __iter__(self):
+        return iter(dict.fromkeys(list(self._values) + list(self.graph)))
+
+    def __len__(self):
+        return len(set(self._values) | set(self.graph))
+
+    @classmethod
+    def from_arrays(cls, sr, hop_length, frame_length, **arrays):
+        """Rebuild features from stored arrays; features that need the raw samples are unavailable"""
+        features = cls(None, sr, hop_length=hop_length, frame_length=frame_length)
+        features._values.update(arrays)
+        return features
+
+    def compute(self, *names):
+        """Compute the named features now and return them as a dict"""
+        return {name: self[name] for name in names}
+
+    def computed(self):
+        """Names of the features computed (or provided) so far"""
+        return list(self._values)
@@ -0,0 +1,365 @@
+"""Overlay, download and analysis feature caches"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .audio import AudioFeatures
+from .lazy import lazy_import
+
+Image = lazy_import('PIL.Image')
+mp = lazy_import('moviepy.editor')
+
+class OverlayCache:
+    """LRU cache of rasterized text overlays (captions, intro banners, badges)
+
+    Each overlay is rendered by ImageMagick once per distinct (text, font, size,
+    colors, width, ...) combination and kept as an RGBA sprite in memory and
+    as a PNG on disk, so other processes and later jobs reuse it too. Both
+    tiers evict least recently used sprites.
+    """
+
+    def __init__(self, cache_dir='cache/overlays', max_items=256, max_disk_bytes=256 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, **params):
+        payload = json.dumps({'text': text, **params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, sprite):
+        with self._lock:
+            self._memory[key] = sprite
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.png'):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def get_sprite(self, text, **params):
+        """Return the overlay as an RGBA uint8 array, rasterizing it on a miss"""
+        key = self.key(text, **params)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = os.path.join(self.cache_dir, f"{key}.png")
+        if os.path.exists(path):
+            try:
+                sprite = np.array(Image.open(path).convert('RGBA'))
+                os.utime(path)  # Mark as recently used for disk eviction
+                self.disk_hits += 1
+                self._remember(key, sprite)
+                return sprite
+            except OSError:
+                pass
+
+        self.misses += 1
+        text_clip = mp.TextClip(text, **params)
+        rgb = text_clip.get_frame(0)
+        if text_clip.mask is not None:
+            alpha = text_clip.mask.get_frame(0) * 255
+        else:
+            alpha = np.full(rgb.shape[:2], 255)
+        sprite = np.dstack([rgb, alpha]).astype('uint8')
+
+        # Write atomically so concurrent workers never read a partial sprite
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        Image.fromarray(sprite, 'RGBA').save(temp_path, format='PNG')
+        os.replace(temp_path, path)
+        self._evict_disk()
+
+        self._remember(key, sprite)
+        return sprite
+
+    def text_clip(self, text, **params):
+        """Drop-in replacement for mp.TextClip(text, **params) backed by the cache"""
+        sprite = self.get_sprite(text, **params)
+        mask = mp.ImageClip(sprite[:, :, 3] / 255.0, ismask=True)
+        return mp.ImageClip(sprite[:, :, :3]).set_mask(mask)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'memory_items': len(self._memory)
+        }
+
+OVERLAY_CACHE = OverlayCache()
+
+class DownloadCache:
+    """Content-addressed cache of downloaded source videos
+
+    Entries are keyed by (video ID, format selector) and stored as
+    <cache_dir>/<key>/ holding the media file and a meta.json with the title
+    and duration. The cache is kept under max_bytes by evicting the least
+    recently used entries. Entries used within the last min_idle_seconds
+    are never evicted, since a job in this or another process may still be
+    reading them; every lookup renews that lease.
+    """
+
+    # Per-key locks are shared by every cache instance in the process
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, cache_dir='cache/videos', max_bytes=20 * 2**30, min_idle_seconds=6 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+
+    @staticmethod
+    def key(video_id, format_selector):
+        return hashlib.sha256(f"{video_id}|{format_selector}".encode('utf-8')).hexdigest()[:24]
+
+    def lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, video_id, format_selector):
+        """Return (media path, metadata) for a cached video, or None"""
+        meta_path = os.path.join(self.entry_dir(self.key(video_id, format_selector)), 'meta.json')
+        try:
+            with open(meta_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        media_path = os.path.join(os.path.dirname(meta_path), metadata['filename'])
+        if not os.path.exists(media_path):
+            return None
+
+        os.utime(meta_path)  # Mark as recently used
+        return media_path, metadata
+
+    def store(self, video_id, format_selector, staging_dir, filename, metadata):
+        """Move a finished download from staging_dir into the cache and return its path
+
+        If another process stored the same video meanwhile, its entry is kept
+        (a job may be reading it) and the path to it is returned instead.
+        """
+        key = self.key(video_id, format_selector)
+        entry_dir = self.entry_dir(key)
+        metadata = dict(metadata, video_id=video_id, format=format_selector, filename=filename,
+                        size=os.path.getsize(os.path.join(staging_dir, filename)))
+
+        with open(os.path.join(staging_dir, 'meta.json'), 'w') as f:
+            json.dump(metadata, f, indent=4)
+
+        existing = self.lookup(video_id, format_selector)
+        if existing:
+            return existing[0]
+
+        # Swap the whole entry in at once so readers never see a partial download
+        try:
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)  # Incomplete entry, e.g. its media was deleted
+            os.replace(staging_dir, entry_dir)
+        except OSError:
+            # Another writer got there between the lookup and the swap; use its entry
+            existing = self.lookup(video_id, format_selector)
+            if not existing:
+                raise
+            return existing[0]
+
+        self.evict(keep=key)
+        return os.path.join(entry_dir, filename)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes, sparing recently used ones"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        in_use_since = time.time() - self.min_idle_seconds
+
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self.cache_dir, key, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(self.cache_dir, key)))
+            entries.append((os.path.getmtime(meta_path), size, key))
+
+        total = sum(size for _, size, _ in entries)
+        for last_used, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep or last_used >= in_use_since:
+                continue
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            total -= size
+
+# Bump whenever transcript, audio or frame scoring changes so stored features are recomputed
+ANALYZER_VERSION = '2'
+
+def file_content_hash(path, chunk_size=2**20):
+    """Return the SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FeatureStore:
+    """Persistent per-video store of analysis features
+
+    Each entry is a directory holding features.npz (RMS envelope, times,
+    audio peaks and the frame timestamp/score/index arrays) and a small
+    manifest.json (analyzer version, settings, transcript segments). Entries
+    are keyed by the video's content hash, ANALYZER_VERSION and the analysis
+    settings, so re-runs with other clip counts, durations or weights skip
+    straight to boundary selection.
+    """
+
+    def __init__(self, root='cache/features', version=ANALYZER_VERSION):
+        self.root = root
+        self.version = version
+
+    def content_hash(self, video_path):
+        """SHA-256 of a video's contents, remembered by path, size and mtime so warm runs skip hashing
+
+        The memo lives under <root>/hashes, so it is shared by later processes too.
+        """
+        stat = os.stat(video_path)
+        identity = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        memo_path = os.path.join(self.root, 'hashes', hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32])
+        try:
+            with open(memo_path) as f:
+                digest = f.read().strip()
+            if len(digest) == 64:
+                return digest
+        except OSError:
+            pass
+
+        digest = file_content_hash(video_path)
+        try:
+            os.makedirs(os.path.dirname(memo_path), exist_ok=True)
+            temp_path = f"{memo_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, 'w') as f:
+                f.write(digest)
+            os.replace(temp_path, memo_path)
+        except OSError:
+            pass  # The memo is only an optimization
+        return digest
+
+    def key(self, video_path, settings=None):
+        payload = json.dumps({'content': self.content_hash(video_path), 'version': self.version,
+                              'settings': settings or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def load(self, key, frames_dir='frames'):
+        """Return (transcript_segments, audio_features, frame_scores) for a key, or None
+
+        transcript_segments is None when the storing run had no transcript.
+        """
+        entry_dir = os.path.join(self.root, key)
+        try:
+            with open(os.path.join(entry_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+            arrays = np.load(os.path.join(entry_dir, 'features.npz'))
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get('version') != self.version:
+            return None
+
+        audio = manifest['audio']
+        audio_features = AudioFeatures.from_arrays(
+            audio['sr'], audio['hop_length'], audio['frame_length'],
+            rms=arrays['rms'], times=arrays['times'], peak_times=arrays['peak_times']
+        )
+
+        frame_scores = [
+            {
+                'timestamp': float(timestamp),
+                'visual_score': float(visual_score),
+                'frame_index': int(frame_index),
+                'frame_path': os.path.join(frames_dir, f'frame_{int(frame_index)}.jpg')
+            }
+            for timestamp, visual_score, frame_index in zip(
+                arrays['frame_timestamps'], arrays['frame_scores'], arrays['frame_indices'])
+        ]
+
+        return manifest['transcript_segments'], audio_features, frame_scores
+
+    def save(self, key, transcript_segments, audio_features, frame_scores, settings=None):
+        """Write the features for a key, replacing any existing entry atomically
+
+        Pass transcript_segments=None when the run had no transcript, so later
+        runs score the transcript again instead of reusing an empty result.
+        Returns False if a concurrent writer replaced the entry first.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.root)
+
+        try:
+            np.savez_compressed(
+                os.path.join(staging_dir, 'features.npz'),
+                rms=np.asarray(audio_features['rms'], dtype=np.float32),
+                times=np.asarray(audio_features['times'], dtype=np.float32),
+                peak_times=np.asarray(audio_features['peak_times'], dtype=np.float64),
+                frame_timestamps=np.array([f['timestamp'] for f in frame_scores], dtype=np.float64),
+                frame_scores=np.array([f['visual_score'] for f in frame_scores], dtype=np.float64),
+                frame_indices=np.array([f['frame_index'] for f in frame_scores], dtype=np.int64)
+            )
+
+            manifest = {
+                'version': self.version,
+                'created_at': time.time(),
+                'settings': settings or {},
+                'audio': {
+                    'sr': audio_features.sr,
+                    'hop_length': audio_features.hop_length,
+                    'frame_length': audio_features.frame_length
+                },
+                'transcript_segments': transcript_segments
+            }
+            with open(os.path.join(staging_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, default=float)
+
+            entry_dir = os.path.join(self.root, key)
+            try:
+                if os.path.exists(entry_dir):
+                    shutil.rmtree(entry_dir)
+                os.replace(staging_dir, entry_dir)
+            except OSError:
+                # Another job stored the same entry in between; its features are as good as ours
+                return False
+            return True
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
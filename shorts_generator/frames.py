@@ -0,0 +1,299 @@
+"""Frame sampling, visual scoring and frame lookup structures"""
+import bisect
+import heapq
+import itertools
+import math
+import os
+
+import numpy as np
+
+from .lazy import lazy_import
+from .streaming import RangeMaxTracker
+
+cv2 = lazy_import('cv2')
+
+def sampled_frame_indices(frame_rate, sample_rate=1, start_index=0, end_index=None):
+    """Yield the frame indices sampled every sample_rate seconds in [start_index, end_index)"""
+    step = frame_rate * sample_rate
+
+    # Round each multiple of the step instead of testing frame_count % step,
+    # which never matches for non-integer frame rates such as 29.97
+    k = max(0, int(math.floor(start_index / step)))
+    for k in itertools.count(k):
+        index = int(round(k * step))
+        if index < start_index:
+            continue
+        if end_index is not None and index >= end_index:
+            return
+        yield index
+
+def iter_sampled_frames(cap, frame_rate, sample_rate=1, sampling='grab', start_index=0, end_index=None):
+    """Yield (frame_index, timestamp, frame) for every sampled frame of an open capture
+
+    sampling='grab' skips unsampled frames with cap.grab() so only sampled frames
+    are retrieved and converted, sampling='seek' seeks straight to every sampled
+    frame (best for sparse sampling of long-GOP files) and sampling='read'
+    decodes every frame like the original loop.
+    """
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    for target in sampled_frame_indices(frame_rate, sample_rate, start_index, end_index):
+        if sampling == 'seek' or target < position:
+            if target != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+        elif sampling == 'grab':
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+        else:
+            while position < target:
+                ret, _ = cap.read()
+                if not ret:
+                    return
+                position += 1
+
+        if not cap.grab():
+            return
+        position += 1
+        ret, frame = cap.retrieve()
+        if not ret:
+            return
+
+        # Take the presentation timestamp from the container when it is available
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if timestamp <= 0 and target > 0:
+            timestamp = target / frame_rate
+
+        yield target, timestamp, frame
+
+def visual_interest_score(frame):
+    """Score one BGR frame at full resolution (reference for the batched scorer)"""
+    # 1. Color variance (more variance often means more visually interesting)
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    color_std = np.std(hsv[:,:,0])
+
+    # 2. Brightness
+    brightness = np.mean(hsv[:,:,2])
+
+    # 3. Edge detection (more edges often means more information/action)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    edge_score = np.count_nonzero(edges) / (edges.shape[0] * edges.shape[1])
+
+    # Combined visual interest score
+    return (color_std * 0.4) + (brightness/255 * 0.2) + (edge_score * 0.4)
+
+def downscale_frame(frame, analysis_width):
+    """Resize a frame to analysis_width pixels wide, keeping its aspect ratio"""
+    height, width = frame.shape[:2]
+    if not analysis_width or width <= analysis_width:
+        return frame
+    analysis_height = max(1, int(round(height * analysis_width / width)))
+    return cv2.resize(frame, (analysis_width, analysis_height), interpolation=cv2.INTER_AREA)
+
+def score_frame_batch(frames):
+    """Score a batch of equally sized BGR frames stacked into one array"""
+    batch = np.stack(frames)
+    n, height, width = batch.shape[:3]
+
+    # Convert the whole batch in one call by treating it as a single tall image
+    tall = batch.reshape(n * height, width, 3)
+    hsv = cv2.cvtColor(tall, cv2.COLOR_BGR2HSV).reshape(n, height * width, 3)
+    gray = cv2.cvtColor(tall, cv2.COLOR_BGR2GRAY).reshape(n, height, width)
+
+    color_std = hsv[:, :, 0].std(axis=1)
+    brightness = hsv[:, :, 2].mean(axis=1)
+
+    # Canny runs per frame so edges never bleed across stacked frame borders
+    edge_counts = np.array([np.count_nonzero(cv2.Canny(g, 100, 200)) for g in gray])
+    edge_score = edge_counts / (height * width)
+
+    return (color_std * 0.4) + (brightness/255 * 0.2) + (edge_score * 0.4)
+
+class FrameStore:
+    """Bounded in-memory store of frame thumbnails with lazy full-resolution export
+
+    Frame scoring only keeps metadata plus a small thumbnail for the best
+    max_thumbnails frames. Full-resolution JPEGs are decoded and written on
+    demand, for the frames that end up in a clip.
+    """
+
+    def __init__(self, video_path, frames_dir='frames', max_thumbnails=256, thumbnail_width=96):
+        self.video_path = video_path
+        self.frames_dir = frames_dir
+        self.max_thumbnails = max_thumbnails
+        self.thumbnail_width = thumbnail_width
+        self._heap = []  # Min-heap of (visual_score, frame_index, thumbnail)
+        self.saved_frames = []
+
+    def frame_path(self, frame_index):
+        return os.path.join(self.frames_dir, f'frame_{frame_index}.jpg')
+
+    def add(self, frame_index, visual_score, frame):
+        """Offer a frame; only the highest scoring frames keep a thumbnail"""
+        if len(self._heap) >= self.max_thumbnails and visual_score <= self._heap[0][0]:
+            return
+        self._push(visual_score, frame_index, downscale_frame(frame, self.thumbnail_width).copy())
+
+    def _push(self, visual_score, frame_index, thumbnail):
+        if len(self._heap) < self.max_thumbnails:
+            heapq.heappush(self._heap, (visual_score, frame_index, thumbnail))
+        elif visual_score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (visual_score, frame_index, thumbnail))
+
+    def merge(self, other):
+        """Fold in the thumbnails kept by another store, e.g. from a worker process"""
+        for visual_score, frame_index, thumbnail in other._heap:
+            self._push(visual_score, frame_index, thumbnail)
+
+    def thumbnail(self, frame_index):
+        """Return the stored thumbnail for a frame, or None if it was evicted"""
+        for _, index, thumbnail in self._heap:
+            if index == frame_index:
+                return thumbnail
+        return None
+
+    def materialize(self, frame_indices):
+        """Decode the given frames from the source video and write them as JPEGs"""
+        os.makedirs(self.frames_dir, exist_ok=True)
+        written = {}
+        cap = cv2.VideoCapture(self.video_path)
+
+        for frame_index in sorted(set(frame_indices)):
+            frame_path = self.frame_path(frame_index)
+            if not os.path.exists(frame_path):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                ret, frame = cap.read()
+                if not ret:
+                    print(f"Could not decode frame {frame_index} for thumbnail")
+                    continue
+                cv2.imwrite(frame_path, frame)
+                self.saved_frames.append(frame_path)
+            written[frame_index] = frame_path
+
+        cap.release()
+        return written
+
+def analyze_frame_range(video_path, start_index=0, end_index=None, sample_rate=1, sampling='grab',
+                        analysis_width=320, batch_size=32, frames_dir='frames', ranges=None):
+    """Score the sampled frames in [start_index, end_index) with a dedicated capture
+
+    Returns the frame entries in timestamp order and the FrameStore holding
+    the thumbnails of the best frames in the range. Given time ranges,
+    frame entries are not kept; a RangeMaxTracker with the best frame in
+    each range is returned in their place.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frame_scores = []
+    tracker = RangeMaxTracker(ranges) if ranges is not None else None
+    frame_store = FrameStore(video_path, frames_dir=frames_dir)
+    frame_rate = cap.get(cv2.CAP_PROP_FPS) or 30
+    pending = []
+
+    if start_index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_index)
+
+    def score_pending():
+        # Score the downscaled frames collected so far in one batch
+        scores = score_frame_batch([small for _, _, small in pending])
+        for (frame_count, timestamp, small), visual_score in zip(pending, scores):
+            frame_store.add(frame_count, float(visual_score), small)
+
+            # Keep metadata only; the JPEG is written later if the frame is used
+            entry = {
+                'timestamp': timestamp,
+                'visual_score': float(visual_score),
+                'frame_index': frame_count,
+                'frame_path': frame_store.frame_path(frame_count)
+            }
+            if tracker is not None:
+                tracker.add(entry)
+            else:
+                frame_scores.append(entry)
+        pending.clear()
+
+    # Only decode the frames sampled every sample_rate seconds
+    for frame_count, timestamp, frame in iter_sampled_frames(cap, frame_rate, sample_rate, sampling,
+                                                             start_index, end_index):
+        small = downscale_frame(frame, analysis_width)
+        if pending and pending[0][2].shape != small.shape:
+            score_pending()
+
+        pending.append((frame_count, timestamp, small))
+        if len(pending) >= batch_size:
+            score_pending()
+
+    if pending:
+        score_pending()
+
+    cap.release()
+    return (tracker if tracker is not None else frame_scores), frame_store
+
+def _init_frame_worker():
+    # Each worker gets one core; let the pool provide the parallelism
+    cv2.setNumThreads(1)
+
+def _analyze_frame_range_job(args):
+    return analyze_frame_range(*args)
+
+class FrameRangeIndex:
+    """Frames sorted by timestamp with a sparse table for O(1) range-max score lookups"""
+
+    def __init__(self, frame_scores):
+        order = sorted(range(len(frame_scores)), key=lambda i: frame_scores[i]['timestamp'])
+        self.frames = [frame_scores[i] for i in order]
+        self.timestamps = np.array([f['timestamp'] for f in self.frames], dtype=float)
+
+        # Rank frames the way max() over frame_scores would pick them: highest
+        # score first, ties going to the frame listed first
+        scores = np.array([f['visual_score'] for f in self.frames], dtype=float)
+        priority = np.lexsort((np.array(order), -scores))
+        self.ranks = np.empty(len(self.frames), dtype=int)
+        self.ranks[priority] = np.arange(len(self.frames))
+
+        # levels[k][i] is the position of the best ranked frame in frames[i:i + 2**k]
+        n = len(self.frames)
+        self.levels = [np.arange(n)]
+        k = 1
+        while (1 << k) <= n:
+            previous = self.levels[-1]
+            width = n - (1 << k) + 1
+            left = previous[:width]
+            right = previous[1 << (k - 1):(1 << (k - 1)) + width]
+            self.levels.append(np.where(self.ranks[right] < self.ranks[left], right, left))
+            k += 1
+
+    def duration(self, default=60):
+        return float(self.timestamps[-1]) if len(self.timestamps) else default
+
+    def top_frame(self, start, end):
+        """Return the highest scoring frame with start <= timestamp <= end, or None"""
+        lo = int(np.searchsorted(self.timestamps, start, side='left'))
+        hi = int(np.searchsorted(self.timestamps, end, side='right'))
+        if lo >= hi:
+            return None
+
+        k = (hi - lo).bit_length() - 1
+        a = self.levels[k][lo]
+        b = self.levels[k][hi - (1 << k)]
+        return self.frames[b if self.ranks[b] < self.ranks[a] else a]
+
+class IntervalSet:
+    """Sorted set of non-overlapping [start, end) intervals with O(log n) overlap checks"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start, end):
+        # Disjoint intervals sorted by start are also sorted by end, so only the
+        # last interval starting before `end` can reach past `start`
+        i = bisect.bisect_left(self.starts, end) - 1
+        return i >= 0 and self.ends[i] > start
+
+    def add(self, start, end):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
@@ -0,0 +1,124 @@
+"""Structured per-stage timing, memory and item-count records"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .runtime import current_rss_bytes
+
+class RssSampler:
+    """Background thread that tracks the peak RSS of the process between start() and stop()"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def start(self):
+        self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return self.peak
+
+class JsonLinesSink:
+    """Hook that appends each record as one JSON line; safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+class Instrumentation:
+    """Emits one record per pipeline stage to every registered hook
+
+    A record is a dict with the stage name, start time, seconds, RSS at
+    start and end, the peak RSS sampled while the stage ran, an item count
+    set by the stage (windows scored, frames analyzed, ...) and any extra
+    fields such as job_id or clip. Hooks are plain callables taking the
+    record; JsonLinesSink writes them to a file.
+
+    capture='cprofile' also saves a cProfile dump per stage to profile_dir
+    and adds its path to the record; capture='tracemalloc' adds the peak
+    Python heap allocated during the stage. Both are process-wide, so the
+    analyzer runs its stages one at a time while capturing.
+    """
+
+    def __init__(self, hooks=(), capture=None, profile_dir='profiles', sample_interval=0.05):
+        if capture not in (None, 'cprofile', 'tracemalloc'):
+            raise ValueError(f"Unknown capture mode: {capture}")
+        self.hooks = list(hooks)
+        self.capture = capture
+        self.profile_dir = profile_dir
+        self.sample_interval = sample_interval
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def emit(self, record):
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                # A broken sink must never fail the job it is observing
+                print(f"Instrumentation hook failed: {e}")
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Measure the enclosed block as stage name; set record['items'] inside the block"""
+        record = {'stage': name, **fields, 'items': None}
+        sampler = RssSampler(self.sample_interval).start()
+        record['rss_start_bytes'] = sampler.peak
+
+        profiler = None
+        if self.capture == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.capture == 'tracemalloc':
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        record['started_at'] = time.time()
+        stage_start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - stage_start
+            record['peak_rss_bytes'] = sampler.stop()
+            record['rss_end_bytes'] = current_rss_bytes()
+
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                label = '_'.join(str(fields[key]) for key in sorted(fields)) or 'run'
+                record['profile_path'] = os.path.join(self.profile_dir, f"{label}_{name}_{os.getpid()}.prof")
+                profiler.dump_stats(record['profile_path'])
+            elif self.capture == 'tracemalloc':
+                import tracemalloc
+                record['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+
+            self.emit(record)
@@ -0,0 +1,26 @@
+"""Deferred imports for the heavy third-party modules used by the pipeline"""
+import importlib
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access
+
+    Lets a module keep `cv2 = lazy_import('cv2')` at the top and use cv2.* as
+    usual, while the import cost is only paid by the stages that need it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name):
+    """Return a LazyModule for name"""
+    return LazyModule(name)
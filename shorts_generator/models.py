@@ -0,0 +1,89 @@
+"""Shared, lazily loaded NLP models"""
+import threading
+import time
+
+from .runtime import current_rss_bytes, ensure_nltk_resources
+
+class ModelRegistry:
+    """Process-wide registry that loads each model on first use and shares it"""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def register(self, name, loader):
+        """Register a zero-argument loader for a model name"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """Return the model, loading it on first use"""
+        if name in self._models:
+            return self._models[name]
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        # One lock per model so different models can load concurrently
+        with self._load_locks[name]:
+            if name not in self._models:
+                rss_before = current_rss_bytes()
+                load_start = time.perf_counter()
+                model = self._loaders[name]()
+                load_seconds = time.perf_counter() - load_start
+                rss_after = current_rss_bytes()
+
+                self._stats[name] = {
+                    'load_seconds': load_seconds,
+                    # Approximate when several models load at the same time
+                    'rss_delta_bytes': rss_after - rss_before,
+                    'rss_after_bytes': rss_after
+                }
+                self._models[name] = model
+                print(f"Loaded model '{name}' in {load_seconds:.2f}s "
+                      f"(+{(rss_after - rss_before) / 2**20:.1f} MiB RSS)")
+
+        return self._models[name]
+
+    def warm(self, names=None):
+        """Load the given models (default: all registered) and return their stats"""
+        for name in (names or list(self._loaders)):
+            self.get(name)
+        return self.stats()
+
+    def stats(self):
+        """Return cold-start time and RSS growth for every loaded model"""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+def _load_sentiment_analyzer():
+    ensure_nltk_resources(['vader_lexicon'])
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+def _load_emotion_classifier():
+    from transformers import pipeline
+    return pipeline('text-classification',
+                    model='bhadresh-savani/distilbert-base-uncased-emotion',
+                    top_k=None)  # Using top_k=None instead of return_all_scores=True
+
+def _load_text_embedding_model():
+    from transformers import AutoTokenizer, AutoModel
+    tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-mpnet-base-v2")
+    model = AutoModel.from_pretrained("sentence-transformers/all-mpnet-base-v2")
+    return tokenizer, model
+
+MODEL_REGISTRY = ModelRegistry()
+MODEL_REGISTRY.register('sentiment', _load_sentiment_analyzer)
+MODEL_REGISTRY.register('emotion', _load_emotion_classifier)
+MODEL_REGISTRY.register('text_embedding', _load_text_embedding_model)
+
+def prewarm_models(names=('sentiment', 'emotion')):
+    """Load the models used by the pipeline, e.g. at worker start"""
+    return MODEL_REGISTRY.warm(list(names))
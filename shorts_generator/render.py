@@ -0,0 +1,317 @@
+"""Clip rendering backends and the concurrent render scheduler"""
+import json
+import math
+import os
+import re
+import subprocess
+import tempfile
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .instrumentation import Instrumentation
+from .lazy import lazy_import
+from .runtime import available_cpu_count, ffmpeg_binary, process_pool_context
+
+cv2 = lazy_import('cv2')
+
+def _ffmpeg_color(color):
+    """Convert an 'rgba(r,g,b,a)' color to ffmpeg's 0xRRGGBB@alpha form"""
+    match = re.match(r'rgba?\(([^)]*)\)', color.replace(' ', ''))
+    if not match:
+        return color
+    parts = match.group(1).split(',')
+    red, green, blue = (int(float(part)) for part in parts[:3])
+    alpha = float(parts[3]) if len(parts) > 3 else 1.0
+    return f"0x{red:02X}{green:02X}{blue:02X}@{alpha}"
+
+def _escape_filter_value(value):
+    """Escape a value for use inside an ffmpeg filtergraph option"""
+    return str(value).replace('\\', '\\\\').replace(':', '\\:').replace("'", "\\'")
+
+class FFmpegShortsRenderer:
+    """Render shorts as a single ffmpeg filtergraph instead of compositing frames in moviepy
+
+    The 9:16 crop, caption, intro banner and platform badge are expressed as
+    crop/scale/drawtext filters, and all platform variants of a clip are split
+    from one decode and encoded in a single ffmpeg invocation. Layout mirrors
+    decorate_platform_clip: caption hidden during the 2 s intro, badge in the
+    top-left corner at 5% of the frame.
+    """
+
+    # Mirrors the TextClip parameters used by generate_captions
+    caption_styles = {
+        'large_centered': {'font': 'Arial-Bold', 'fontsize': 50, 'stroke_width': 2, 'y': '(h-text_h)/2'},
+        'subtitle': {'font': 'Arial', 'fontsize': 30, 'stroke_width': 1.5, 'y': 'h*0.85'},
+        'dynamic': {'font': 'Arial-Bold', 'fontsize': None, 'stroke_width': 2, 'y': '(h-text_h)/2'}
+    }
+
+    # Mirrors the branding TextClips in decorate_platform_clip
+    platform_badges = {
+        'youtube_shorts': ('#Shorts', 'rgba(255,0,0,0.6)'),
+        'instagram_reels': ('Reels', 'rgba(225,48,108,0.6)'),
+        'tiktok': ('TikTok', 'rgba(0,0,0,0.6)')
+    }
+
+    def __init__(self, platform_specs, caption_width=720, preset='medium'):
+        self.platform_specs = platform_specs
+        self.caption_width = caption_width
+        self.preset = preset
+
+    @staticmethod
+    def _font_option(font):
+        # ImageMagick style names ('Arial-Bold') to fontconfig patterns ('Arial:style=Bold')
+        family, _, style = font.partition('-')
+        pattern = f"{family}:style={style}" if style else family
+        return f"font='{_escape_filter_value(pattern)}'"
+
+    def _text_file(self, workdir, name, text, fontsize, width=None):
+        """Write text pre-wrapped to roughly width pixels (drawtext does not wrap); returns (path, lines)"""
+        chars_per_line = max(10, int((width or self.caption_width) / (fontsize * 0.55)))
+        wrapped = textwrap.fill(text, chars_per_line)
+        path = os.path.join(workdir, f"{name}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(wrapped)
+        return _escape_filter_value(path), wrapped.count('\n') + 1
+
+    def frame_width(self, video_path):
+        """Width of the 9:16 frame cut from a source video, as build_command's crop produces it"""
+        capture = cv2.VideoCapture(video_path)
+        try:
+            height = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        finally:
+            capture.release()
+        return int(height * 9 / 16 / 2) * 2 if height else self.caption_width
+
+    def _variant_filters(self, workdir, clip_data, platform, duration, frame_width):
+        specs = self.platform_specs[platform]
+        style = self.caption_styles[specs['caption_style']]
+        filters = []
+
+        fontsize = style['fontsize']
+        if fontsize is None:
+            # For dynamic style, shorter text gets a larger font
+            words = clip_data['text'].split()
+            fontsize = 65 if len(words) <= 3 else 50 if len(words) <= 6 else 35
+
+        has_intro = duration > 2.0
+        caption_file, _ = self._text_file(workdir, platform + '_caption', clip_data['text'], fontsize)
+        caption = (f"drawtext={self._font_option(style['font'])}"
+                   f":textfile='{caption_file}'"
+                   f":fontsize={fontsize}:fontcolor=white:borderw={style['stroke_width']}:bordercolor=black"
+                   f":line_spacing=4:x=(w-text_w)/2:y={style['y']}")
+        if has_intro:
+            caption += ":enable='gte(t,2)'"
+        filters.append(caption)
+
+        if has_intro:
+            # Like the moviepy intro: text wrapped to the frame width on a full-width translucent band
+            intro = f"Top moment - {clip_data['top_emotion'].upper()}"
+            intro_file, lines = self._text_file(workdir, platform + '_intro', intro, 40, width=frame_width)
+            band_height = lines * (40 + 8) + 8
+            filters.append(f"drawbox=x=0:y=0:w=iw:h={band_height}:color={_ffmpeg_color('rgba(0,0,0,0.5)')}"
+                           f":t=fill:enable='lt(t,2)'")
+            filters.append(f"drawtext={self._font_option('Arial')}"
+                           f":textfile='{intro_file}'"
+                           f":fontsize=40:fontcolor=white:line_spacing=8"
+                           f":x=(w-text_w)/2:y=({band_height}-text_h)/2:enable='lt(t,2)'")
+
+        badge_text, badge_color = self.platform_badges.get(platform, (None, None))
+        if badge_text:
+            badge_file, _ = self._text_file(workdir, platform + '_badge', badge_text, 30)
+            filters.append(f"drawtext={self._font_option('Arial-Bold')}"
+                           f":textfile='{badge_file}'"
+                           f":fontsize=30:fontcolor=white:box=1:boxcolor={_ffmpeg_color(badge_color)}"
+                           f":boxborderw=10:x=w*0.05:y=h*0.05")
+
+        return ",".join(filters)
+
+    def build_command(self, workdir, video_path, clip_data, output_paths, threads=None):
+        """Build the ffmpeg command rendering every platform variant of a clip"""
+        platforms = list(output_paths)
+        start_time = max(0, clip_data['start'])
+        durations = {
+            platform: max(0, min(clip_data['end'] - start_time, self.platform_specs[platform]['max_length']))
+            for platform in platforms
+        }
+
+        # Crop the centre to 9:16 (or stretch narrower sources, like the moviepy path) once, then split
+        graph = [f"[0:v]crop=w='min(iw,trunc(ih*9/16/2)*2)':h=ih:x=(iw-ow)/2:y=0,"
+                 f"scale=w='trunc(ih*9/16/2)*2':h=ih,split={len(platforms)}"
+                 + "".join(f"[base{i}]" for i in range(len(platforms)))]
+        frame_width = self.frame_width(video_path)
+        for i, platform in enumerate(platforms):
+            filters = self._variant_filters(workdir, clip_data, platform, durations[platform], frame_width)
+            graph.append(f"[base{i}]{filters}[v{i}]")
+
+        cmd = [
+            ffmpeg_binary(), '-nostdin', '-y', '-v', 'error',
+            # Input seeking so the decode starts near the clip, not at the top of the file
+            '-ss', f"{start_time:.3f}", '-t', f"{max(durations.values()):.3f}",
+            '-i', video_path,
+            '-filter_complex', ";".join(graph)
+        ]
+        for i, platform in enumerate(platforms):
+            cmd += ['-map', f"[v{i}]", '-map', '0:a?', '-t', f"{durations[platform]:.3f}",
+                    '-c:v', 'libx264', '-preset', self.preset, '-pix_fmt', 'yuv420p', '-c:a', 'aac']
+            if threads:
+                cmd += ['-threads', str(threads)]
+            cmd.append(output_paths[platform])
+        return cmd
+
+    def render(self, video_path, clip_data, output_paths, threads=None):
+        """Render all platform variants; returns a dict of platform -> output path
+
+        Raises RuntimeError with the last lines of ffmpeg's error output if the encode fails.
+        """
+        with tempfile.TemporaryDirectory(prefix='shorts_ffmpeg_') as workdir:
+            cmd = self.build_command(workdir, video_path, clip_data, output_paths, threads)
+            process = subprocess.run(cmd, capture_output=True, text=True)
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg render failed (exit {process.returncode}):\n{_stderr_tail(process.stderr)}")
+
+        return {platform: path if os.path.exists(path) else None for platform, path in output_paths.items()}
+
+def _stderr_tail(stderr, num_lines=5, max_line_length=200):
+    # ffmpeg echoes the whole filtergraph in its parse errors, so shorten long lines
+    # instead of keeping the last characters, which would only show the graph
+    lines = stderr.strip().splitlines()[-num_lines:]
+    return "\n".join(line if len(line) <= max_line_length else line[:max_line_length] + "..." for line in lines)
+
+def _render_clip_job(platform_specs, video_path, clip_data, output_paths, render_mode, render_backend, threads,
+                     capture=None, profile_dir='profiles', record_fields=None):
+    """Render one clip in a worker process; errors are returned, not raised
+
+    Returns (platform clips, error, stage record), the record measured in
+    the worker so its RSS is the encoder's own.
+    """
+    from .analyzer import VideoAnalyzer
+    records = []
+    instrumentation = Instrumentation([records.append], capture=capture, profile_dir=profile_dir)
+    try:
+        with instrumentation.stage('render', **(record_fields or {})) as record:
+            analyzer = VideoAnalyzer()
+            analyzer.platform_specs = platform_specs
+            platform_clips = analyzer.render_clip(video_path, clip_data, output_paths, render_mode, render_backend,
+                                                  threads)
+            record['items'] = sum(1 for path in platform_clips.values() if path)
+        return platform_clips, None, records[0]
+    except Exception as e:
+        return {platform: None for platform in output_paths}, f"{type(e).__name__}: {e}", records[0]
+
+class RenderScheduler:
+    """Encode several clips concurrently while keeping total encoder threads within a CPU budget
+
+    Each clip job runs one x264 encode per platform variant, so the budget is
+    planned in encodes: with 24 cores, three variants per clip and
+    min_threads_per_encode=4, two clips render at once with four threads per
+    variant. A failing clip is reported in its result and does not stop its
+    siblings. Each render's stage record is emitted through
+    instrumentation with record_fields and the 1-based clip number added.
+    """
+
+    def __init__(self, cpu_budget=None, max_parallel=None, min_threads_per_encode=4, platform_specs=None,
+                 instrumentation=None, record_fields=None):
+        self.instrumentation = instrumentation or Instrumentation()
+        self.record_fields = record_fields or {}
+        self.cpu_budget = cpu_budget or available_cpu_count()
+        self.max_parallel = max_parallel
+        self.min_threads_per_encode = min_threads_per_encode
+        if platform_specs is None:
+            from .analyzer import VideoAnalyzer
+            platform_specs = VideoAnalyzer().platform_specs
+        self.platform_specs = platform_specs
+
+    def plan(self, num_jobs, encodes_per_job=1):
+        """Return (parallel clips, threads per encode) for a number of clips
+
+        encodes_per_job is the number of platform variants each clip encodes
+        at once, so parallel clips x encodes_per_job x threads stays within
+        the CPU budget.
+        """
+        encodes_per_job = max(1, encodes_per_job)
+        max_parallel = self.max_parallel or self.cpu_budget // (self.min_threads_per_encode * encodes_per_job)
+        parallel = max(1, min(num_jobs, max_parallel, self.cpu_budget // encodes_per_job))
+        return parallel, max(1, self.cpu_budget // (parallel * encodes_per_job))
+
+    def iter_results(self, jobs):
+        """Render (video_path, clip_data, output_paths, render_mode, render_backend) jobs,
+        yielding (job index, platform clips, error) as each clip finishes"""
+        if not jobs:
+            return
+        parallel, threads = self.plan(len(jobs), encodes_per_job=max(len(job[2]) for job in jobs))
+
+        def job_args(index, job):
+            fields = dict(self.record_fields, clip=index + 1)
+            return (self.platform_specs, *job, threads, self.instrumentation.capture,
+                    self.instrumentation.profile_dir, fields)
+
+        if parallel == 1:
+            for index, job in enumerate(jobs):
+                platform_clips, error, record = _render_clip_job(*job_args(index, job))
+                self.instrumentation.emit(record)
+                yield index, platform_clips, error
+            return
+
+        with ProcessPoolExecutor(max_workers=parallel, mp_context=process_pool_context()) as executor:
+            futures = {executor.submit(_render_clip_job, *job_args(index, job)): index
+                       for index, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    platform_clips, error, record = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. killed for memory); siblings carry on
+                    platform_clips, error = {platform: None for platform in jobs[index][2]}, f"{type(e).__name__}: {e}"
+                    record = dict(self.record_fields, stage='render', clip=index + 1, items=0, error=error)
+                self.instrumentation.emit(record)
+                yield index, platform_clips, error
+
+    def run(self, jobs):
+        """Render all jobs and return [(platform clips, error)] in job order"""
+        results = [None] * len(jobs)
+        for index, platform_clips, error in self.iter_results(jobs):
+            results[index] = (platform_clips, error)
+        return results
+
+def benchmark_render_backends(video_path, clip_data, backends=('moviepy', 'ffmpeg'),
+                              output_dir=os.path.join('benchmarks', 'work', 'render')):
+    """Render one clip with each backend and report encoded frames per second"""
+    from .analyzer import VideoAnalyzer
+
+    os.makedirs(output_dir, exist_ok=True)
+    analyzer = VideoAnalyzer()
+    capture = cv2.VideoCapture(video_path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    finally:
+        capture.release()
+    start_time = max(0, clip_data['start'])
+
+    results = {}
+    for backend in backends:
+        output_paths = {
+            platform: os.path.join(output_dir, f"{backend}_{platform}.mp4")
+            for platform in analyzer.platform_specs
+        }
+        # Frames encoded across all variants
+        frames = sum(int(math.ceil(min(clip_data['end'] - start_time, specs['max_length']) * fps))
+                     for specs in analyzer.platform_specs.values())
+
+        render_start = time.perf_counter()
+        outputs = analyzer.render_clip(video_path, clip_data, output_paths, render_backend=backend)
+        seconds = time.perf_counter() - render_start
+
+        results[backend] = {
+            'seconds': seconds,
+            'frames': frames,
+            'frames_per_second': frames / seconds if seconds > 0 else 0,
+            'outputs': outputs
+        }
+        print(f"{backend}: {frames} frames in {seconds:.1f}s ({results[backend]['frames_per_second']:.1f} fps)")
+
+    with open(os.path.join(output_dir, 'render_benchmark.json'), 'w') as f:
+        json.dump(results, f, indent=4)
+
+    return results
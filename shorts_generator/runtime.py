@@ -0,0 +1,108 @@
+"""Process, CPU, ffmpeg and NLTK helpers shared by every stage"""
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+def current_rss_bytes():
+    """Return the resident set size of the current process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Fall back to peak RSS (kilobytes on Linux) where /proc is unavailable
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def available_cpu_count():
+    """Return the number of cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def process_pool_context():
+    """Start method for worker process pools
+
+    Pools are created while other stages run torch inference on their own
+    threads, and forking a multithreaded process can leave locks (OpenMP,
+    torch, logging) held in the child. Workers are started from a clean
+    forkserver process instead, or spawned where forkserver is unavailable.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+def ffmpeg_binary():
+    """Return the ffmpeg executable, preferring $FFMPEG_BINARY, then PATH, then moviepy's bundled copy"""
+    binary = os.environ.get('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if binary:
+        return binary
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+def keyframe_at_or_before(video_path, time_seconds, search_window=10.0):
+    """Return the time of the last video keyframe at or before time_seconds
+
+    Lists keyframes with ffmpeg itself (ffprobe is not always installed),
+    decoding only the keyframes in a window before the timestamp and
+    doubling the window until one is found. Raises CalledProcessError if
+    ffmpeg fails.
+    """
+    window = search_window
+    while True:
+        window_start = max(0.0, time_seconds - window)
+        # -t is an input option, so the listing covers the whole window; -copyts keeps source timestamps
+        result = subprocess.run([
+            ffmpeg_binary(), '-nostdin', '-hide_banner', '-skip_frame', 'nokey',
+            '-ss', f'{window_start:.6f}', '-t', f'{time_seconds - window_start + 0.001:.6f}', '-i', video_path,
+            '-copyts', '-map', '0:v:0', '-vf', 'showinfo', '-f', 'null', '-'
+        ], check=True, capture_output=True, text=True)
+        keyframes = [float(pts_time) for pts_time in re.findall(r'pts_time:([0-9.]+)', result.stderr)
+                     if float(pts_time) <= time_seconds + 0.001]
+        if keyframes:
+            return max(keyframes)
+        if window_start == 0.0:
+            return 0.0
+        window *= 2
+
+# NLTK resource name -> path inside an nltk_data directory
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+_nltk_lock = threading.Lock()
+_nltk_ready = set()
+
+def nltk_data_dir():
+    """Local cache for NLTK data: $NLTK_DATA if set, else ~/.cache/shorts_generator/nltk_data"""
+    return os.environ.get('NLTK_DATA') or os.path.join(os.path.expanduser('~'), '.cache', 'shorts_generator',
+                                                       'nltk_data')
+
+def ensure_nltk_resources(names=('punkt', 'vader_lexicon')):
+    """Make NLTK resources available, downloading into the local cache only if missing
+
+    Resolved once per process; later calls are a set lookup.
+    """
+    missing = [name for name in names if name not in _nltk_ready]
+    if not missing:
+        return
+
+    import nltk
+
+    with _nltk_lock:
+        data_dir = nltk_data_dir()
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+
+        for name in missing:
+            if name in _nltk_ready:
+                continue
+            try:
+                nltk.data.find(NLTK_RESOURCES.get(name, name))
+            except LookupError:
+                os.makedirs(data_dir, exist_ok=True)
+                nltk.download(name, download_dir=data_dir, quiet=True)
+            _nltk_ready.add(name)
@@ -0,0 +1,93 @@
+"""Where analysis and render media come from: YouTube or a local file"""
+import hashlib
+import os
+import subprocess
+import uuid
+
+from .runtime import ffmpeg_binary
+
+# Format used for the full-resolution renders and the low-resolution analysis proxy
+FULL_FORMAT = 'best[height<=720]'
+PROXY_FORMAT = 'bestvideo[height<=240]+bestaudio/best[height<=360]'
+
+class YouTubeSource:
+    """Media source for a YouTube video, fetched through the analyzer's download cache"""
+
+    def __init__(self, analyzer, url):
+        self.analyzer = analyzer
+        self.url = url
+
+    def fetch(self, format_selector=FULL_FORMAT):
+        """Return (path, title) of the whole video in the given format"""
+        return self.analyzer.download_youtube_video(self.url, format_selector=format_selector)
+
+    def fetch_range(self, start, end, output_path, format_selector=FULL_FORMAT):
+        """Download only [start, end] seconds of the video; returns the path or None"""
+        video_id = self.analyzer.extract_video_id(self.url)
+        cmd = [
+            "yt-dlp",
+            "-f", format_selector,
+            "--download-sections", f"*{start:.3f}-{end:.3f}",
+            "--force-keyframes-at-cuts",
+            "-o", output_path,
+            f"https://www.youtube.com/watch?v={video_id}"
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except Exception as e:
+            print(f"Error downloading range {start:.1f}-{end:.1f}s: {e}")
+            return None
+        return output_path if os.path.exists(output_path) else None
+
+class LocalFileSource:
+    """Media source backed by a local file, e.g. an upload or a test fixture
+
+    The proxy is a downscaled copy made once with ffmpeg, and ranges are cut
+    from the original file, mirroring what YouTubeSource fetches remotely.
+    Proxies are named after the file's absolute path, size and modification
+    time and the proxy height, so files sharing a name never share a proxy
+    and a replaced file gets a new one.
+    """
+
+    def __init__(self, path, title=None, proxy_height=240, proxy_dir='cache/proxies'):
+        self.path = path
+        self.title = title or os.path.splitext(os.path.basename(path))[0]
+        self.proxy_height = proxy_height
+        self.proxy_dir = proxy_dir
+
+    def proxy_key(self):
+        stat = os.stat(self.path)
+        identity = f"{os.path.abspath(self.path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.proxy_height}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:24]
+
+    def fetch(self, format_selector=FULL_FORMAT):
+        if format_selector != PROXY_FORMAT:
+            return self.path, self.title
+
+        proxy_path = os.path.join(self.proxy_dir, f"{self.proxy_key()}_proxy.mp4")
+        if not os.path.exists(proxy_path):
+            os.makedirs(self.proxy_dir, exist_ok=True)
+            # Encode under a unique name and rename, so jobs sharing proxy_dir never see a partial file
+            temp_path = f"{proxy_path}.{uuid.uuid4().hex[:8]}.mp4"
+            cmd = [
+                ffmpeg_binary(), '-nostdin', '-y', '-v', 'error', '-i', self.path,
+                '-vf', f'scale=-2:{self.proxy_height}', '-c:v', 'libx264', '-preset', 'veryfast',
+                '-c:a', 'aac', temp_path
+            ]
+            subprocess.run(cmd, check=True, capture_output=True)
+            os.replace(temp_path, proxy_path)
+        return proxy_path, self.title
+
+    def fetch_range(self, start, end, output_path, format_selector=FULL_FORMAT):
+        # Re-encode the short range so the cut is frame accurate
+        cmd = [
+            ffmpeg_binary(), '-nostdin', '-y', '-v', 'error',
+            '-ss', f"{start:.3f}", '-i', self.path, '-t', f"{end - start:.3f}",
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-c:a', 'aac', output_path
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Error cutting range {start:.1f}-{end:.1f}s: {e.stderr.decode(errors='replace')[-300:]}")
+            return None
+        return output_path
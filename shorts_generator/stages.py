@@ -0,0 +1,51 @@
+"""Dependency-ordered execution of pipeline stages"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class StageGraph:
+    """Small DAG executor that runs each stage on a thread once its dependencies finish"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, function, *dependencies):
+        """Add a stage; function is called with the results of its dependencies in order"""
+        self.stages[name] = (function, dependencies)
+
+    def _timed(self, name, function, args):
+        stage_start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.timings[name] = time.perf_counter() - stage_start
+
+    def run(self):
+        """Run every stage and return a dict of stage name -> result"""
+        return dict(self.iter_run())
+
+    def iter_run(self):
+        """Run every stage, yielding (stage name, result) as each one finishes"""
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(self.stages) or 1) as executor:
+            while pending or running:
+                # Start every stage whose dependencies are all done
+                for name, (function, dependencies) in list(pending.items()):
+                    if all(dependency in results for dependency in dependencies):
+                        args = [results[dependency] for dependency in dependencies]
+                        running[executor.submit(self._timed, name, function, args)] = name
+                        del pending[name]
+
+                if not running:
+                    raise ValueError(f"Unresolvable stage dependencies: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Re-raise stage errors; stages already running are left to finish
+                    results[name] = future.result()
+                    yield name, results[name]
@@ -0,0 +1,191 @@
+"""Bounded-memory building blocks for long-form analysis
+
+Each helper consumes its input incrementally and keeps only the state it
+needs to carry across blocks, so memory stays flat however long the video is.
+"""
+import bisect
+import heapq
+import subprocess
+
+import numpy as np
+
+from .audio import decode_audio_command
+
+def iter_audio_blocks(media_path, sample_rate=22050, block_seconds=30):
+    """Decode a media file's audio through an ffmpeg pipe, yielding mono float32 blocks"""
+    cmd = decode_audio_command(media_path, sample_rate)
+    block_bytes = int(block_seconds * sample_rate) * 4
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            # A short read can end mid-sample only at EOF, where ffmpeg has written whole samples
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+class StreamingRms:
+    """Frame-wise RMS over blocks of samples, matching librosa.feature.rms(center=True)
+
+    The signal is zero-padded by frame_length // 2 on both sides, as librosa
+    does, and the samples of a frame that straddles two blocks are carried
+    over to the next feed().
+    """
+
+    def __init__(self, frame_length=2048, hop_length=512):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self._buffer = np.zeros(frame_length // 2, dtype=np.float32)
+
+    def _frames(self):
+        count = (len(self._buffer) - self.frame_length) // self.hop_length + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        power = np.square(self._buffer[:(count - 1) * self.hop_length + self.frame_length])
+        windows = np.lib.stride_tricks.sliding_window_view(power, self.frame_length)[::self.hop_length]
+        rms = np.sqrt(windows.mean(axis=-1))
+        self._buffer = self._buffer[count * self.hop_length:]
+        return rms
+
+    def feed(self, samples):
+        """Add samples and return the RMS of every frame they complete"""
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        return self._frames()
+
+    def finish(self):
+        """Pad the end of the signal and return the RMS of the remaining frames"""
+        self._buffer = np.concatenate([self._buffer, np.zeros(self.frame_length // 2, dtype=np.float32)])
+        return self._frames()
+
+class StreamingPeakPicker:
+    """librosa.util.peak_pick over a signal that arrives in blocks
+
+    A value is decided once post_max / post_avg values after it are known,
+    and only the pre_max / pre_avg values before the next undecided one are
+    kept. feed() and finish() return global indices of the new peaks.
+    """
+
+    def __init__(self, pre_max, post_max, pre_avg, post_avg, delta, wait):
+        self.pre_max = pre_max
+        self.post_max = post_max
+        self.pre_avg = pre_avg
+        self.post_avg = post_avg
+        self.delta = delta
+        self.wait = wait
+        self._values = np.zeros(0, dtype=np.float32)
+        self._offset = 0  # global index of self._values[0]
+        self._next = 0    # next global index to decide
+        self._total = 0
+
+    def _scan(self, final):
+        x = self._values
+        offset = self._offset
+        total = self._total
+        lookahead = max(self.post_max, self.post_avg)
+        peaks = []
+
+        while self._next < total and (final or self._next + lookahead <= total):
+            n = self._next
+            i = n - offset
+            value = x[i]
+            # Same windows as librosa, clipped to the signal; the history kept covers the pre windows
+            window = x[max(0, n - self.pre_max) - offset:min(n + self.post_max, total) - offset]
+            if value == window.max():
+                average = x[max(0, n - self.pre_avg) - offset:min(n + self.post_avg, total) - offset].mean()
+                if value >= average + self.delta:
+                    peaks.append(n)
+                    self._next = n + self.wait + 1
+                    continue
+            self._next = n + 1
+
+        # Keep only the history the next undecided value can look back on
+        keep_from = max(offset, min(self._next, total) - max(self.pre_max, self.pre_avg))
+        self._values = x[keep_from - offset:]
+        self._offset = keep_from
+        return peaks
+
+    def feed(self, values):
+        self._values = np.concatenate([self._values, np.asarray(values, dtype=np.float32)])
+        self._total += len(values)
+        return self._scan(final=False)
+
+    def finish(self):
+        return self._scan(final=True)
+
+class TopK:
+    """The k highest scoring items pushed so far; ties keep the earliest pushed
+
+    items() returns them in the order a stable descending sort of every
+    pushed item would, so a top-K run matches the head of the full sort.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._count = 0
+
+    def push(self, score, item):
+        # Later items compare smaller on ties, so they are evicted first
+        entry = (score, -self._count, item)
+        self._count += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def items(self):
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
+
+class RangeMaxTracker:
+    """Best scoring frame inside each of a fixed set of [start, end] ranges
+
+    Frames can be added in any order and trackers from different workers
+    merged; ties go to the earliest timestamp, as FrameRangeIndex does.
+    Memory is one entry per range, however many frames are seen.
+    """
+
+    def __init__(self, ranges):
+        self.ranges = [(float(start), float(end)) for start, end in ranges]
+        self.order = sorted(range(len(self.ranges)), key=lambda i: self.ranges[i][0])
+        self.starts = [self.ranges[i][0] for i in self.order]
+        self.max_length = max((end - start for start, end in self.ranges), default=0)
+        self.best = [None] * len(self.ranges)
+        self.frames_seen = 0
+
+    @staticmethod
+    def _better(entry, current):
+        if current is None:
+            return True
+        return (entry['visual_score'] > current['visual_score'] or
+                (entry['visual_score'] == current['visual_score'] and entry['timestamp'] < current['timestamp']))
+
+    def _offer(self, i, entry):
+        if self._better(entry, self.best[i]):
+            self.best[i] = entry
+
+    def add(self, entry):
+        self.frames_seen += 1
+        timestamp = entry['timestamp']
+        position = bisect.bisect_right(self.starts, timestamp) - 1
+        # Only ranges starting within max_length before the frame can contain it
+        while position >= 0 and self.starts[position] >= timestamp - self.max_length:
+            i = self.order[position]
+            if timestamp <= self.ranges[i][1]:
+                self._offer(i, entry)
+            position -= 1
+
+    def merge(self, other):
+        self.frames_seen += other.frames_seen
+        for i, entry in enumerate(other.best):
+            if entry is not None:
+                self._offer(i, entry)
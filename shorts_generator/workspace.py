@@ -0,0 +1,47 @@
+"""Per-job scratch and output directories"""
+import os
+import shutil
+import uuid
+
+class JobWorkspace:
+    """Per-job scratch and output directories, so concurrent jobs never share files
+
+    Layout under <root>/<job_id>/:
+        scratch/         proxies, range cuts and other intermediates
+        output/          rendered clips, metadata and reports
+        output/frames/   thumbnails of the frames used by the clips
+
+    cleanup controls what happens to scratch/ when the job ends: 'always'
+    removes it, 'on_success' keeps it after a failure for debugging, and
+    'never' leaves it in place. Output is never removed.
+    """
+
+    def __init__(self, root='jobs', job_id=None, cleanup='on_success'):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.root = os.path.join(root, self.job_id)
+        self.scratch_dir = os.path.join(self.root, 'scratch')
+        self.output_dir = os.path.join(self.root, 'output')
+        self.frames_dir = os.path.join(self.output_dir, 'frames')
+        self.cleanup_policy = cleanup
+
+    def create(self):
+        for directory in (self.scratch_dir, self.output_dir, self.frames_dir):
+            os.makedirs(directory, exist_ok=True)
+        return self
+
+    def scratch_path(self, *parts):
+        return os.path.join(self.scratch_dir, *parts)
+
+    def output_path(self, *parts):
+        return os.path.join(self.output_dir, *parts)
+
+    def cleanup(self, succeeded=True):
+        if self.cleanup_policy == 'always' or (self.cleanup_policy == 'on_success' and succeeded):
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.create()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup(succeeded=exc_type is None)
+        return False
@@ -0,0 +1,40 @@
+"""Shared fixtures: synthetic media made with ffmpeg's lavfi sources, so no test needs the network"""
+import os
+import subprocess
+import sys
+from fractions import Fraction
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from shorts_generator.runtime import ffmpeg_binary  # noqa: E402
+
+RATES = {'ntsc': Fraction(30000, 1001), 'ntsc-film': Fraction(24000, 1001)}
+
+@pytest.fixture(scope='session')
+def synthetic_video(tmp_path_factory):
+    """Factory for testsrc2 videos with a beeping tone and a fixed keyframe interval
+
+    fps is a number or one of the named ffmpeg rates in RATES, e.g. 'ntsc' for 30000/1001.
+    """
+    media_dir = tmp_path_factory.mktemp('media')
+    made = {}
+
+    def make(duration=20, size='320x180', fps=30, gop_seconds=2):
+        key = (duration, size, fps, gop_seconds)
+        if key not in made:
+            path = str(media_dir / f"testsrc_{duration}s_{size}_{fps}fps_gop{gop_seconds}.mp4")
+            gop = str(int(round((RATES.get(fps) or Fraction(str(fps))) * gop_seconds)))
+            subprocess.run([
+                ffmpeg_binary(), '-nostdin', '-y', '-v', 'error',
+                '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}:duration={duration}',
+                '-f', 'lavfi', '-i', f'sine=frequency=440:beep_factor=4:duration={duration}',
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                '-g', gop, '-keyint_min', gop, '-sc_threshold', '0', '-c:a', 'aac', '-shortest', path
+            ], check=True, capture_output=True)
+            made[key] = path
+        return made[key]
+
+    return make
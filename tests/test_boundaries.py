@@ -0,0 +1,154 @@
+import copy
+import random
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from shorts_generator.analyzer import VideoAnalyzer
+from shorts_generator.frames import FrameRangeIndex, IntervalSet
+
+def baseline_top_frame(frame_scores, start, end):
+    """Linear scan the original identify_clip_boundaries did for every clip"""
+    clip_frames = [f for f in frame_scores if start <= f['timestamp'] <= end]
+    return max(clip_frames, key=lambda x: x['visual_score']) if clip_frames else None
+
+def baseline_identify_clip_boundaries(transcript_segments, audio_features, frame_scores, min_duration=10,
+                                      max_duration=60):
+    """The original list-scan boundary selection, kept as the reference for the indexed version"""
+    potential_clips = []
+
+    if not transcript_segments:
+        peak_times = audio_features['peak_times']
+        if len(peak_times) < 2:
+            video_duration = max([frame['timestamp'] for frame in frame_scores]) if frame_scores else 60
+            num_segments = max(1, int(video_duration / 20))
+            peak_times = np.linspace(0, video_duration, num_segments)
+
+        for i, peak in enumerate(peak_times[:-1]):
+            segment_start = peak
+            segment_end = min(peak_times[i+1], segment_start + max_duration)
+            if segment_end - segment_start < min_duration:
+                segment_end = min(segment_start + min_duration, max([frame['timestamp'] for frame in frame_scores]))
+            top_visual_frame = baseline_top_frame(frame_scores, segment_start, segment_end)
+            potential_clips.append({
+                'start': segment_start, 'end': segment_end, 'duration': segment_end - segment_start,
+                'text': "No transcript available", 'sentiment': {'compound': 0}, 'top_emotion': 'neutral',
+                'interesting_score': 0.5,
+                'top_visual_frame': top_visual_frame['frame_path'] if top_visual_frame else None,
+                'visual_score': top_visual_frame['visual_score'] if top_visual_frame else 0
+            })
+    else:
+        for segment in transcript_segments[:20]:
+            segment_start = segment['start']
+            segment_end = segment['end']
+            nearest_peak_before = max([p for p in audio_features['peak_times'] if p <= segment_start],
+                                      default=segment_start)
+            nearest_peak_after = min([p for p in audio_features['peak_times'] if p >= segment_end],
+                                     default=segment_end)
+            adjusted_start = nearest_peak_before if segment_start - nearest_peak_before < 5 else segment_start
+            adjusted_end = nearest_peak_after if nearest_peak_after - segment_end < 5 else segment_end
+
+            duration = adjusted_end - adjusted_start
+            if duration < min_duration:
+                extension = (min_duration - duration) / 2
+                adjusted_start = max(0, adjusted_start - extension)
+                adjusted_end = adjusted_end + extension
+            elif duration > max_duration:
+                middle = (adjusted_start + adjusted_end) / 2
+                adjusted_start = middle - (max_duration / 2)
+                adjusted_end = middle + (max_duration / 2)
+
+            top_visual_frame = baseline_top_frame(frame_scores, adjusted_start, adjusted_end)
+            potential_clips.append({
+                'start': adjusted_start, 'end': adjusted_end, 'duration': adjusted_end - adjusted_start,
+                'text': segment['text'], 'sentiment': segment['sentiment'], 'top_emotion': segment['top_emotion'],
+                'interesting_score': segment['interesting_score'],
+                'top_visual_frame': top_visual_frame['frame_path'] if top_visual_frame else None,
+                'visual_score': top_visual_frame['visual_score'] if top_visual_frame else 0
+            })
+
+    potential_clips.sort(key=lambda x: x['interesting_score'] + x['visual_score'], reverse=True)
+    final_clips = []
+    for clip in potential_clips:
+        if not any(clip['start'] < selected['end'] and clip['end'] > selected['start'] for selected in final_clips):
+            final_clips.append(clip)
+        if len(final_clips) >= 10:
+            break
+
+    for clip in final_clips:
+        clip['start_formatted'] = str(timedelta(seconds=int(clip['start'])))
+        clip['end_formatted'] = str(timedelta(seconds=int(clip['end'])))
+        clip['start_frame'] = int(clip['start'] * 30)
+        clip['end_frame'] = int(clip['end'] * 30)
+    return final_clips
+
+def random_frames(rng, duration):
+    # Repeated scores check that ties resolve to the frame max() would pick
+    frames = [{'timestamp': float(t), 'visual_score': rng.choice([rng.random(), 0.5]), 'frame_index': t * 30,
+               'frame_path': f"frame_{t}.jpg"} for t in range(int(duration))]
+    rng.shuffle(frames)
+    return frames
+
+def random_segments(rng, duration):
+    segments = []
+    for _ in range(rng.randint(1, 40)):
+        start = rng.uniform(0, duration)
+        segments.append({'start': start, 'end': start + rng.uniform(1, 90), 'text': "words",
+                         'sentiment': {'compound': 0.1}, 'top_emotion': 'joy',
+                         'interesting_score': rng.choice([rng.random(), 0.3])})
+    segments.sort(key=lambda x: x['interesting_score'], reverse=True)
+    return segments
+
+def test_top_frame_matches_linear_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        frames = random_frames(rng, rng.uniform(1, 300))
+        index = FrameRangeIndex(frames)
+        for _ in range(20):
+            start = rng.uniform(-10, 310)
+            end = start + rng.uniform(0, 90)
+            assert index.top_frame(start, end) is baseline_top_frame(frames, start, end)
+
+def test_top_frame_empty():
+    index = FrameRangeIndex([])
+    assert index.top_frame(0, 100) is None
+    assert index.duration() == 60
+
+def test_interval_set_matches_pairwise_checks():
+    rng = random.Random(1)
+    for _ in range(200):
+        intervals = IntervalSet()
+        selected = []
+        for _ in range(50):
+            start = rng.uniform(0, 600)
+            end = start + rng.choice([rng.uniform(0.1, 60), 10.0])
+            expected = any(start < s_end and end > s_start for s_start, s_end in selected)
+            assert intervals.overlaps(start, end) == expected
+            if not expected:
+                intervals.add(start, end)
+                selected.append((start, end))
+
+def test_touching_intervals_do_not_overlap():
+    intervals = IntervalSet()
+    intervals.add(10, 20)
+    assert not intervals.overlaps(0, 10)
+    assert not intervals.overlaps(20, 30)
+    assert intervals.overlaps(19.999, 30)
+
+@pytest.mark.parametrize('with_transcript', [True, False])
+def test_identify_clip_boundaries_matches_baseline(with_transcript):
+    rng = random.Random(2 if with_transcript else 3)
+    analyzer = VideoAnalyzer()
+    for case in range(300):
+        duration = rng.uniform(20, 600)
+        frames = random_frames(rng, duration)
+        audio_features = {'peak_times': sorted(rng.uniform(0, duration) for _ in range(rng.randint(0, 40)))}
+        segments = random_segments(rng, duration) if with_transcript else []
+
+        expected = baseline_identify_clip_boundaries(copy.deepcopy(segments), audio_features, frames)
+        clips = analyzer.identify_clip_boundaries(copy.deepcopy(segments), audio_features, frames)
+        # The indexed version also records the frame index of the top frame
+        for clip in clips:
+            clip.pop('top_visual_frame_index')
+        assert clips == expected, f"case {case}"
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from shorts_generator.audio import AudioFeatures
+from shorts_generator.cache import DownloadCache, FeatureStore, file_content_hash
+
+def make_features():
+    audio_features = AudioFeatures.from_arrays(22050, 512, 2048, rms=np.linspace(0, 1, 50, dtype=np.float32),
+                                               times=np.arange(50, dtype=np.float32) * 0.02,
+                                               peak_times=np.array([0.2, 0.6]))
+    frame_scores = [{'timestamp': 1.0, 'visual_score': 0.5, 'frame_index': 30},
+                    {'timestamp': 2.0, 'visual_score': 0.7, 'frame_index': 60}]
+    return audio_features, frame_scores
+
+def test_feature_store_round_trip(tmp_path):
+    store = FeatureStore(root=str(tmp_path))
+    audio_features, frame_scores = make_features()
+    segments = [{'start': 0, 'end': 5, 'text': 'hi'}]
+
+    assert store.save('key', segments, audio_features, frame_scores)
+    stored_segments, stored_audio, stored_frames = store.load('key', frames_dir='frames')
+    assert stored_segments == segments
+    np.testing.assert_allclose(stored_audio['peak_times'], [0.2, 0.6])
+    assert [frame['frame_index'] for frame in stored_frames] == [30, 60]
+
+def test_missing_transcript_is_stored_as_none(tmp_path):
+    store = FeatureStore(root=str(tmp_path))
+    store.save('key', None, *make_features())
+    assert store.load('key')[0] is None
+
+def test_concurrent_saves_of_one_key_never_raise(tmp_path):
+    store = FeatureStore(root=str(tmp_path))
+    audio_features, frame_scores = make_features()
+    errors = []
+
+    def save():
+        try:
+            store.save('key', [], audio_features, frame_scores)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store.load('key') is not None
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.')]
+
+def test_content_hash_is_remembered_until_the_file_changes(tmp_path):
+    video_path = tmp_path / 'video.bin'
+    video_path.write_bytes(b'a' * 1000)
+    store = FeatureStore(root=str(tmp_path / 'store'))
+
+    assert store.content_hash(str(video_path)) == file_content_hash(str(video_path))
+    assert len(os.listdir(tmp_path / 'store' / 'hashes')) == 1
+
+    video_path.write_bytes(b'b' * 1001)
+    assert store.content_hash(str(video_path)) == file_content_hash(str(video_path))
+
+def stage_download(cache, content=b'video'):
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix='.staging.', dir=cache.cache_dir)
+    with open(os.path.join(staging_dir, 'video.mp4'), 'wb') as f:
+        f.write(content)
+    return staging_dir
+
+def test_concurrent_stores_keep_one_entry(tmp_path):
+    cache = DownloadCache(cache_dir=str(tmp_path))
+    staging_dirs = [stage_download(cache, bytes([i]) * 100) for i in range(20)]
+    paths, errors = [], []
+
+    def store(staging_dir):
+        try:
+            paths.append(cache.store('abc', 'best', staging_dir, 'video.mp4', {'title': 'Video'}))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store, args=(staging_dir,)) for staging_dir in staging_dirs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(paths)) == 1 and os.path.exists(paths[0])
+    assert cache.lookup('abc', 'best')[0] == paths[0]
+
+def test_evict_spares_recently_used_entries(tmp_path):
+    cache = DownloadCache(cache_dir=str(tmp_path), max_bytes=0, min_idle_seconds=3600)
+    for video_id in ('old', 'recent'):
+        cache.store(video_id, 'best', stage_download(cache, b'x' * 1000), 'video.mp4', {})
+    old_meta = os.path.join(cache.entry_dir(cache.key('old', 'best')), 'meta.json')
+    os.utime(old_meta, (time.time() - 7200, time.time() - 7200))
+
+    cache.evict()
+
+    assert cache.lookup('old', 'best') is None
+    assert cache.lookup('recent', 'best') is not None
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from shorts_generator.frames import (downscale_frame, iter_sampled_frames, sampled_frame_indices,  # noqa: E402
+                                     score_frame_batch, visual_interest_score)
+
+# Documented tolerance: downscaled batch scores may drift in absolute value, but must
+# order frames like full-resolution visual_interest_score (Spearman rho >= 0.9)
+MIN_RANK_CORRELATION = 0.9
+
+def rank_correlation(a, b):
+    return float(np.corrcoef(np.argsort(np.argsort(a)), np.argsort(np.argsort(b)))[0, 1])
+
+def textured_frames(count=40, height=720, width=1280, seed=0):
+    """Flat colors blended with block textures of random scale and contrast"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        base = np.empty((height, width, 3), dtype=np.uint8)
+        base[:] = rng.integers(0, 256, 3)
+        cells = int(rng.integers(2, 40))
+        texture = cv2.resize(rng.integers(0, 256, (cells, cells * 2, 3)).astype(np.uint8), (width, height),
+                             interpolation=cv2.INTER_NEAREST)
+        alpha = rng.uniform(0, 1)
+        frames.append(cv2.addWeighted(base, 1 - alpha, texture, alpha, 0))
+    return frames
+
+def video_frames(video_path, count=20):
+    capture = cv2.VideoCapture(video_path)
+    try:
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        for index in np.linspace(0, total - 1, count).astype(int):
+            capture.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = capture.read()
+            if ok:
+                frames.append(frame)
+        return frames
+    finally:
+        capture.release()
+
+def batched_scores(frames, analysis_width=320):
+    return score_frame_batch([downscale_frame(frame, analysis_width) for frame in frames])
+
+def test_batched_scores_rank_textured_frames_like_full_resolution():
+    frames = textured_frames()
+    reference = [visual_interest_score(frame) for frame in frames]
+    assert rank_correlation(reference, batched_scores(frames)) >= MIN_RANK_CORRELATION
+
+def test_batched_scores_rank_video_frames_like_full_resolution(synthetic_video):
+    frames = video_frames(synthetic_video(duration=20, size='1280x720')) + textured_frames(count=10, seed=1)
+    reference = [visual_interest_score(frame) for frame in frames]
+    assert rank_correlation(reference, batched_scores(frames)) >= MIN_RANK_CORRELATION
+
+def test_batch_scoring_matches_scoring_frames_one_at_a_time():
+    frames = [downscale_frame(frame, 320) for frame in textured_frames(count=8, seed=2)]
+    one_by_one = [score_frame_batch([frame])[0] for frame in frames]
+    np.testing.assert_allclose(score_frame_batch(frames), one_by_one)
+
+def test_sampled_frame_indices_at_29_97_fps():
+    # One hour at NTSC rate: one frame per second, never drifting more than half a frame
+    indices = list(sampled_frame_indices(29.97, end_index=int(3600 * 29.97)))
+    assert len(indices) == 3600
+    assert set(np.diff(indices)) == {29, 30}
+    for k, index in enumerate(indices):
+        assert abs(index - k * 29.97) <= 0.5
+
+def test_sampled_frame_indices_range_is_a_slice_of_the_full_sequence():
+    full = list(sampled_frame_indices(29.97, sample_rate=2, end_index=5000))
+    for start, end in [(0, 5000), (1, 5000), (60, 61), (1000, 3000), (4999, 5000), (2500, 2500)]:
+        assert list(sampled_frame_indices(29.97, 2, start, end)) == [i for i in full if start <= i < end]
+
+def test_sampled_frame_indices_at_integer_fps_match_modulo_sampling():
+    assert list(sampled_frame_indices(30, end_index=1000)) == [i for i in range(1000) if i % 30 == 0]
+
+@pytest.mark.parametrize('sampling', ['grab', 'seek', 'read'])
+def test_iter_sampled_frames_at_29_97_fps(synthetic_video, sampling):
+    capture = cv2.VideoCapture(synthetic_video(duration=10, fps='ntsc'))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        assert fps == pytest.approx(29.97, abs=0.01)
+        sampled = [(index, timestamp) for index, timestamp, _ in iter_sampled_frames(capture, fps, sampling=sampling)]
+    finally:
+        capture.release()
+    assert [index for index, _ in sampled] == list(sampled_frame_indices(fps, end_index=300))
+    for k, (_, timestamp) in enumerate(sampled):
+        assert abs(timestamp - k) <= 0.5 / fps
@@ -0,0 +1,71 @@
+import pytest
+
+from shorts_generator.render import RenderScheduler, _stderr_tail
+
+PLATFORM_SPECS = {name: {} for name in ('tiktok', 'youtube_shorts', 'instagram_reels')}
+
+def scheduler(**kwargs):
+    return RenderScheduler(platform_specs=PLATFORM_SPECS, **kwargs)
+
+@pytest.mark.parametrize('cpu_budget', [1, 2, 3, 4, 8, 12, 24, 64])
+@pytest.mark.parametrize('num_jobs', [1, 2, 5, 10])
+@pytest.mark.parametrize('encodes_per_job', [0, 1, 3])
+def test_plan_stays_within_cpu_budget(cpu_budget, num_jobs, encodes_per_job):
+    parallel, threads = scheduler(cpu_budget=cpu_budget).plan(num_jobs, encodes_per_job=encodes_per_job)
+    encodes = max(1, encodes_per_job)
+    assert 1 <= parallel <= num_jobs
+    assert threads >= 1
+    # A single clip may oversubscribe only when the budget is smaller than its own encodes
+    assert parallel * encodes * threads <= max(cpu_budget, encodes)
+
+def test_plan_example_from_docstring():
+    # 24 cores, three variants per clip and four threads per encode: two clips at once
+    assert scheduler(cpu_budget=24).plan(10, encodes_per_job=3) == (2, 4)
+
+def test_plan_uses_whole_budget_for_one_clip():
+    assert scheduler(cpu_budget=16).plan(1, encodes_per_job=2) == (1, 8)
+
+def test_plan_respects_max_parallel():
+    assert scheduler(cpu_budget=64, max_parallel=3).plan(10) == (3, 21)
+
+def test_render_error_keeps_ffmpeg_message_lines():
+    graph = ";".join(f"[base{i}]crop=1:1,drawtext=textfile='/tmp/caption_{i}.txt'[v{i}]" for i in range(20))
+    stderr = ("[AVFilterGraph @ 0x1] No such filter: 'drawtext'\n"
+              f"Failed to set value '{graph}' for option 'filter_complex': Filter not found\n"
+              "Error parsing global options: Filter not found\n")
+    tail = _stderr_tail(stderr)
+    assert "No such filter: 'drawtext'" in tail
+    assert tail.splitlines()[-1] == "Error parsing global options: Filter not found"
+    assert all(len(line) <= 203 for line in tail.splitlines())
+
+def test_render_platform_clips_closes_open_writers_when_setup_fails(synthetic_video, monkeypatch, tmp_path):
+    pytest.importorskip('moviepy')
+    from moviepy.video.io import ffmpeg_writer
+    from shorts_generator.analyzer import VideoAnalyzer
+
+    opened = []
+
+    class FailingWriter(ffmpeg_writer.FFMPEG_VideoWriter):
+        """Starts one encoder, then fails to start the next"""
+
+        def __init__(self, *args, **kwargs):
+            if opened:
+                raise OSError("encoder failed to start")
+            super().__init__(*args, **kwargs)
+            self.was_closed = False
+            opened.append(self)
+
+        def close(self):
+            self.was_closed = True
+            super().close()
+
+    monkeypatch.setattr(ffmpeg_writer, 'FFMPEG_VideoWriter', FailingWriter)
+    analyzer = VideoAnalyzer()
+    monkeypatch.setattr(analyzer, 'decorate_platform_clip', lambda video_path, clip, clip_data, platform: clip)
+    output_paths = {platform: str(tmp_path / f"{platform}.mp4") for platform in analyzer.platform_specs}
+
+    with pytest.raises(OSError, match="encoder failed to start"):
+        analyzer.render_platform_clips(synthetic_video(duration=10), {'start': 1, 'end': 6, 'text': "hello"},
+                                       output_paths)
+    assert len(opened) == 1 and opened[0].was_closed
+    assert not any(path.exists() for path in tmp_path.iterdir() if path.suffix == '.mp4')
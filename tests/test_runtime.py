@@ -0,0 +1,21 @@
+import pytest
+
+from shorts_generator.runtime import keyframe_at_or_before
+
+@pytest.mark.parametrize('gop_seconds, time_seconds, expected', [
+    (2, 0.0, 0.0),
+    (2, 1.9, 0.0),
+    (2, 2.0, 2.0),
+    (2, 21.0, 20.0),
+    (2, 47.9, 46.0),
+    (5, 62.0, 60.0),
+    (5, 64.9, 60.0),
+    (5, 65.0, 65.0),
+])
+def test_keyframe_at_or_before_returns_last_keyframe(synthetic_video, gop_seconds, time_seconds, expected):
+    video_path = synthetic_video(duration=70, size='160x90', gop_seconds=gop_seconds)
+    assert keyframe_at_or_before(video_path, time_seconds) == pytest.approx(expected, abs=1e-3)
+
+def test_keyframe_search_widens_past_the_first_window(synthetic_video):
+    video_path = synthetic_video(duration=70, size='160x90', gop_seconds=5)
+    assert keyframe_at_or_before(video_path, 64.9, search_window=1.0) == pytest.approx(60.0, abs=1e-3)
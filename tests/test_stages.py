@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from shorts_generator.stages import StageGraph
+
+def test_results_follow_dependencies():
+    graph = StageGraph()
+    graph.add('total', lambda a, b: a + b, 'a', 'b')
+    graph.add('a', lambda: 1)
+    graph.add('b', lambda a: a * 10, 'a')
+    assert graph.run() == {'a': 1, 'b': 10, 'total': 11}
+    assert set(graph.timings) == {'a', 'b', 'total'}
+
+def test_stage_error_propagates_and_skips_dependents():
+    ran = []
+    graph = StageGraph()
+    graph.add('download', lambda: (_ for _ in ()).throw(OSError("disk full")))
+    graph.add('frames', lambda download: ran.append('frames'), 'download')
+
+    with pytest.raises(OSError, match="disk full"):
+        graph.run()
+    assert ran == []
+    # The failed stage is still timed
+    assert 'download' in graph.timings
+
+def test_error_is_raised_while_siblings_are_running():
+    release = threading.Event()
+    graph = StageGraph()
+    graph.add('slow', lambda: release.wait(5))
+    graph.add('broken', lambda: 1 / 0)
+
+    events = graph.iter_run()
+    with pytest.raises(ZeroDivisionError):
+        next(events)
+    release.set()
+
+def test_unresolvable_dependencies():
+    graph = StageGraph()
+    graph.add('a', lambda b: b, 'b')
+    graph.add('b', lambda a: a, 'a')
+    with pytest.raises(ValueError, match="Unresolvable stage dependencies"):
+        graph.run()
+
+    graph = StageGraph()
+    graph.add('a', lambda missing: missing, 'missing')
+    with pytest.raises(ValueError, match=r"\['a'\]"):
+        graph.run()
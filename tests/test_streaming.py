@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from shorts_generator.audio import PEAK_PICK_PARAMS
+from shorts_generator.streaming import StreamingPeakPicker, StreamingRms, TopK, iter_audio_blocks
+
+librosa = pytest.importorskip('librosa')
+
+def random_blocks(signal, rng):
+    """Split a signal into blocks of random size, including empty and one-sample blocks"""
+    position = 0
+    while position < len(signal):
+        size = int(rng.choice([0, 1, rng.integers(1, 5000)]))
+        yield signal[position:position + size]
+        position += size
+
+@pytest.mark.parametrize('length', [0, 100, 2048, 22050 * 3 + 17])
+def test_streaming_rms_matches_librosa(length):
+    rng = np.random.default_rng(length)
+    y = rng.uniform(-1, 1, length).astype(np.float32)
+    rms = StreamingRms(frame_length=2048, hop_length=512)
+    streamed = np.concatenate([rms.feed(block) for block in random_blocks(y, rng)] + [rms.finish()])
+
+    expected = librosa.feature.rms(y=y, frame_length=2048, hop_length=512, center=True)[0]
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(streamed, expected, rtol=1e-4, atol=1e-6)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_peak_picker_matches_librosa(seed):
+    rng = np.random.default_rng(seed)
+    # Bursts over a noise floor, with plateaus so ties between neighbours are exercised
+    values = np.abs(rng.normal(0, 0.1, 3000)).astype(np.float32)
+    for start in rng.integers(0, 2990, 60):
+        values[start:start + rng.integers(1, 8)] = rng.uniform(0.5, 1.5)
+
+    picker = StreamingPeakPicker(**PEAK_PICK_PARAMS)
+    peaks = []
+    for block in random_blocks(values, rng):
+        peaks += picker.feed(block)
+    peaks += picker.finish()
+
+    assert peaks == list(librosa.util.peak_pick(values, **PEAK_PICK_PARAMS))
+
+def test_audio_blocks_match_whole_decode(synthetic_video):
+    from shorts_generator.audio import decode_audio
+
+    path = synthetic_video(duration=5)
+    blocks = list(iter_audio_blocks(path, block_seconds=1))
+    assert len(blocks) > 1
+    np.testing.assert_array_equal(np.concatenate(blocks), decode_audio(path))
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 20, 500).tolist()
+    top = TopK(25)
+    for i, score in enumerate(scores):
+        top.push(score, i)
+    assert top.items() == sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:25]
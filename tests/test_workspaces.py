@@ -0,0 +1,78 @@
+import importlib.util
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shorts_generator import FeatureStore, JobWorkspace, LocalFileSource, VideoAnalyzer
+from shorts_generator.runtime import ffmpeg_binary
+
+pytest.importorskip('cv2')
+pytest.importorskip('librosa')
+
+def available_render_backend():
+    """The ffmpeg backend when ffmpeg has drawtext, else moviepy when it is installed"""
+    filters = subprocess.run([ffmpeg_binary(), '-hide_banner', '-filters'], capture_output=True, text=True).stdout
+    if re.search(r'\sdrawtext\s', filters):
+        return 'ffmpeg'
+    if importlib.util.find_spec('moviepy'):
+        return 'moviepy'
+    pytest.skip("no render backend: ffmpeg lacks drawtext and moviepy is not installed")
+
+def run_job(analyzer, workspace, source, render_backend, num_clips=2):
+    """Run one job to completion, returning its clips and every error it reported"""
+    clips, errors = None, []
+    for event in analyzer.iter_process_video(None, num_clips, render_backend=render_backend, analysis_mode='proxy',
+                                             source=source, workspace=workspace, render_workers=1):
+        if event['event'] == 'clip' and event['error']:
+            errors.append(f"clip {event['index'] + 1} failed: {event['error']}")
+        elif event['event'] == 'error':
+            errors.append(event['message'])
+        elif event['event'] == 'done':
+            clips = event['clips']
+    return clips, errors
+
+def test_concurrent_jobs_write_only_their_own_files(synthetic_video, tmp_path):
+    # Jobs share one analyzer, feature store and proxy directory, as jobs on one host do
+    render_backend = available_render_backend()
+    video_path = synthetic_video(duration=60)
+    analyzer = VideoAnalyzer(feature_store=FeatureStore(root=str(tmp_path / 'features')))
+    workspaces = [JobWorkspace(root=str(tmp_path / 'jobs'), job_id=f"job_{i}") for i in range(4)]
+
+    with ThreadPoolExecutor(max_workers=len(workspaces)) as executor:
+        results = list(executor.map(
+            lambda workspace: run_job(analyzer, workspace,
+                                      LocalFileSource(video_path, proxy_dir=str(tmp_path / 'proxies')),
+                                      render_backend),
+            workspaces))
+
+    problems = []
+    seen = {}
+    for workspace, (clips, errors) in zip(workspaces, results):
+        problems += [f"{workspace.job_id}: {error}" for error in errors]
+        if not clips:
+            problems.append(f"{workspace.job_id} produced no clips")
+            continue
+
+        paths = [workspace.output_path('clip_metadata.json')]
+        for clip in clips:
+            for platform, path in clip['file_paths'].items():
+                if path:
+                    paths.append(path)
+                else:
+                    problems.append(f"{workspace.job_id} has no {platform} file for clip {clip['clip_index']}")
+            if clip['thumbnail']:
+                paths.append(clip['thumbnail'])
+
+        for path in paths:
+            if not os.path.abspath(path).startswith(os.path.abspath(workspace.root) + os.sep):
+                problems.append(f"{workspace.job_id} wrote outside its workspace: {path}")
+            if not os.path.exists(path):
+                problems.append(f"{workspace.job_id} is missing {path}")
+            if path in seen:
+                problems.append(f"{seen[path]} and {workspace.job_id} share {path}")
+            seen[path] = workspace.job_id
+
+    assert not problems, "\n".join(problems)